@@ -0,0 +1,233 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import study_db
+from study_core import AIClient, ResponseCache, store_generated_test
+from study_flashcards import parse_flashcards
+from study_metrics import percentile
+WORDS = "neuron gradient entropy mitosis enzyme vector matrix theorem lemma proof integral derivative protein genome orbit quantum photon catalyst".split()
+def summarize(name, samples, ops, elapsed, unit="ops"):
+    samples = sorted(samples)
+    return {
+        'name': name,
+        'iterations': len(samples),
+        'unit': unit,
+        'throughput': round(ops / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(samples, 0.5) * 1000, 3),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 3),
+        'max_ms': round(samples[-1] * 1000, 3),
+    }
+def measure(name, fn, iterations, ops_per_call=1, unit="ops", warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(name, samples, iterations * ops_per_call, time.perf_counter() - started, unit)
+def phrase(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+def seed_playlists(path, count, rng):
+    conn = study_db.connect(path)
+    with conn:
+        conn.executemany(study_db.INSERT_PLAYLIST, ((f"{phrase(rng, 3).title()} {i}", f"https://www.youtube.com/playlist?list=PL{i:016d}") for i in range(count)))
+    return conn
+def bench_playlists(workdir, count, iterations, rng):
+    conn = seed_playlists(os.path.join(workdir, f"playlists_{count}.db"), count, rng)
+    def scroll_all():
+        rows = []
+        page = study_db.playlist_page(conn)
+        while page:
+            rows.extend(page)
+            page = study_db.playlist_page(conn, rows[-1]) if len(page) == 200 else []
+        return rows
+    try:
+        return [
+            measure(f"playlists_{count}_first_page", lambda: study_db.playlist_page(conn), iterations * 10, 200, "rows"),
+            measure(f"playlists_{count}_scroll_all", scroll_all, max(1, iterations // 10), count, "rows"),
+            measure(f"playlists_{count}_filter", lambda: study_db.playlist_page(conn, filter_text=rng.choice(WORDS)), iterations, 200, "rows"),
+        ]
+    finally:
+        conn.close()
+def practice_test(rng, questions=5):
+    return "\n".join(f"{i + 1}. {phrase(rng, 12)}?" for i in range(questions)) + "\nAnswers:\n" + "\n".join(f"{i + 1}. {phrase(rng, 20)}" for i in range(questions))
+def bench_generated_tests(workdir, count, rng):
+    path = os.path.join(workdir, "generated_tests.db")
+    seed_playlists(path, 1000, rng).close()
+    conn = study_db.connect(path)
+    names = [row[0] for row in conn.execute("SELECT name FROM playlists")]
+    conn.close()
+    tests = [(rng.choice(names), practice_test(rng)) for _ in range(count)]
+    writer = study_db.WriteQueue(path)
+    try:
+        writer.submit(store_generated_test, *tests[0]).result()
+        samples = []
+        lock = threading.Lock()
+        def done(t0, future):
+            with lock:
+                samples.append(time.perf_counter() - t0)
+        started = time.perf_counter()
+        for name, content in tests:
+            writer.submit(store_generated_test, name, content).add_done_callback(lambda future, t0=time.perf_counter(): done(t0, future))
+        writer.flush()
+        queued = summarize("generated_test_inserts_queued", samples, count, time.perf_counter() - started, "inserts")
+        single = measure("generated_test_insert_single", lambda: writer.submit(store_generated_test, *rng.choice(tests)).result(), max(1, count // 20), 1, "inserts")
+    finally:
+        writer.close()
+    return [queued, single]
+def flashcard_output(rng, cards):
+    formats = [
+        lambda front, back: f"Front: {front} | Back: {back}",
+        lambda front, back: f"- **Front:** {front}\n  **Back:** {back}",
+        lambda front, back: f"Q: {front}\nA: {back}",
+        lambda front, back: f"Card {rng.randint(1, 99)}: Term - {front} | Definition - {back}",
+    ]
+    return "\n\n".join(rng.choice(formats)(phrase(rng, 8) + "?", phrase(rng, 16)) for _ in range(cards))
+def bench_flashcards(cards, iterations, rng):
+    text = flashcard_output(rng, cards)
+    return [measure(f"parse_flashcards_{cards}", lambda: parse_flashcards(text), iterations, cards, "cards")]
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    def log_message(self, format, *args):
+        pass
+    def send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    def send_event(self, payload):
+        data = f"data: {payload if isinstance(payload, str) else json.dumps(payload)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.server.latency)
+        tokens = [f"token{i} " for i in range(self.server.completion_tokens)]
+        prompt_tokens = sum(len(m.get("content", "")) for m in request.get("messages", [])) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+        base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": request.get("model", "bench")}
+        if not request.get("stream"):
+            self.send_json(dict(base, object="chat.completion", choices=[{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}], usage=usage))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in tokens:
+            time.sleep(self.server.token_delay)
+            self.send_event(dict(base, object="chat.completion.chunk", choices=[{"index": 0, "delta": {"content": token}, "finish_reason": None}]))
+        self.send_event(dict(base, object="chat.completion.chunk", choices=[], usage=usage))
+        self.send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+def start_fake_openai(latency, completion_tokens, token_delay):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.completion_tokens = completion_tokens
+    server.token_delay = token_delay
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server
+def fan_out(name, client, requests, concurrency, stream):
+    def call(i):
+        t0 = time.perf_counter()
+        client.complete("summarize_content", [{"role": "user", "content": f"request {i % 16}"}], None, (lambda delta: None) if stream else None)
+        return time.perf_counter() - t0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(call, range(requests)))
+    return summarize(name, samples, requests, time.perf_counter() - started, "requests")
+def bench_ai_fanout(workdir, requests, concurrency, latency_ms):
+    if importlib.util.find_spec("openai") is None:
+        return [{'name': "ai_fanout", 'skipped': "openai is not installed"}]
+    server = start_fake_openai(latency_ms / 1000, 32, 0.001)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    cache = ResponseCache(os.path.join(workdir, "ai_cache.db"))
+    try:
+        client = AIClient("bench", base_url=base_url)
+        results = [
+            fan_out(f"ai_fanout_{concurrency}x", client, requests, concurrency, False),
+            fan_out(f"ai_fanout_{concurrency}x_stream", client, requests, concurrency, True),
+        ]
+        cached = AIClient("bench", base_url=base_url, cache=cache)
+        fan_out("ai_fanout_cache_warmup", cached, 16, concurrency, False)
+        results.append(fan_out(f"ai_fanout_{concurrency}x_cached", cached, requests, concurrency, False))
+        for result in results:
+            result['ideal_throughput'] = round(concurrency / (latency_ms / 1000), 1) if not result['name'].endswith("_cached") else None
+        return results
+    finally:
+        cache.close()
+        server.shutdown()
+        server.server_close()
+def compare(results, baseline, tolerance):
+    previous = {result['name']: result for result in baseline.get('results', []) if 'skipped' not in result}
+    regressions = []
+    for result in results:
+        before = previous.get(result['name'])
+        if before is None or 'skipped' in result:
+            continue
+        if result['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{result['name']}: p99 {before['p99_ms']} ms -> {result['p99_ms']} ms")
+        if before['throughput'] and result['throughput'] < before['throughput'] * (1 - tolerance):
+            regressions.append(f"{result['name']}: throughput {before['throughput']} -> {result['throughput']} {result['unit']}/s")
+    return regressions
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark playlist loading, practice test inserts, flashcard parsing and AI request fan-out without the GUI.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 100000], help="playlist table sizes")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--inserts", type=int, default=2000, help="practice tests to insert")
+    parser.add_argument("--cards", type=int, default=5000, help="flashcards in the synthetic AI output")
+    parser.add_argument("--requests", type=int, default=200, help="AI requests to fan out")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="simulated server latency per AI request")
+    parser.add_argument("--only", nargs="+", choices=("playlists", "tests", "flashcards", "ai"))
+    parser.add_argument("--baseline", help="earlier JSON output to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown relative to the baseline")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    only = set(args.only or ("playlists", "tests", "flashcards", "ai"))
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="study-bench-")
+    results = []
+    try:
+        if "playlists" in only:
+            for size in args.sizes:
+                results += bench_playlists(workdir, size, args.iterations, rng)
+        if "tests" in only:
+            results += bench_generated_tests(workdir, args.inserts, rng)
+        if "flashcards" in only:
+            results += bench_flashcards(args.cards, max(1, args.iterations // 5), rng)
+        if "ai" in only:
+            results += bench_ai_fanout(workdir, args.requests, args.concurrency, args.latency_ms)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    report = {'python': platform.python_version(), 'sqlite': study_db.sqlite3.sqlite_version, 'platform': platform.platform(), 'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"), 'results': results}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+if __name__ == "__main__":
+    sys.exit(main())
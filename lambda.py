@@ -1,26 +1,65 @@
-import sys, os
+import sys, os, time
+STARTED_AT = time.perf_counter()
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
-from PyQt5.QtWebEngineWidgets import *
-import json, openai
+import json
 from datetime import datetime
 import sqlite3
+import threading
 from functools import partial
+import study_db
+from study_batch import BATCH_FEATURES, BatchRunner, batch_main
+from study_transcripts import TranscriptIngestor, extract_video_id, make_fetcher
+from study_flashcards import GRADES, DeckStore, save_review, store_flashcards
+from study_metrics import COLUMNS as METRIC_COLUMNS, MetricsRecorder
+from study_notes import NOTES_DIR, NoteStore, list_notes, load_note, note_history
+from study_core import AIClient, ChunkedPipeline, PhaseTimer, RequestBuilder, RequestCancelled, ResponseCache, RetrievalQA, SearchIndex, VectorIndex, feature_messages, read_transcript, store_generated_test, store_note
 class ModernStudyApp(QMainWindow):
-    def __init__(self):
+    db_write_finished = pyqtSignal(object, str, object)
+    def __init__(self, startup_timer=None):
         super().__init__()
+        self.startup_timer = startup_timer or PhaseTimer()
+        self.startup_finished = False
         self.setWindowTitle("Modern Study Assistant")
+        self.config = {}
+        self.ai_client = AIClient()
         self.setup_openai()
+        self.ai_executor = AIRequestExecutor(self.config.get('max_concurrent_requests', 4), self)
+        self.transcript_executor = AIRequestExecutor(self.config.get('transcript_downloads', 2), self)
+        self.startup_timer.mark("config")
         self.setup_database()
+        self.startup_timer.mark("database")
         self.setup_styles()
         self.setup_ui()
+        self.startup_timer.mark("ui")
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.startup_finished:
+            self.startup_finished = True
+            QTimer.singleShot(0, self.finish_startup)
+    def finish_startup(self):
+        self.startup_timer.mark("first paint")
         self.load_playlists()
+        self.startup_timer.mark("playlists")
+        for playlist_id, url in self.ingestor.pending_playlists():
+            self.ingest_transcript(playlist_id, url)
+        if not list_notes(self.conn) and os.path.isdir(NOTES_DIR):
+            self.write_db(self.import_notes, on_done=self.notes_imported, error_text="Failed to import notes")
+        else:
+            if self.search_index.is_empty():
+                self.write_db(lambda conn: SearchIndex(conn).rebuild(commit=False), error_text="Failed to build search index")
+            self.open_latest_note()
+        self.ai_executor.submit("index_library", lambda cancel_event, on_delta: self.vector_index.backfill(cancel_event), lambda indexed: None, lambda error: None)
+        target_ms = self.config.get('startup_target_ms', 1500)
+        self.statusBar().showMessage(f"Started in {self.startup_timer.total_ms():.0f} ms", 5000)
+        if "--startup-report" in sys.argv or self.startup_timer.total_ms() > target_ms:
+            print(self.startup_timer.report(target_ms), file=sys.stderr)
     def setup_openai(self):
         try:
             with open('config.json', 'r') as f:
-                config = json.load(f)
-                openai.api_key = config.get('openai_api_key')
+                self.config = json.load(f)
+                self.ai_client.set_api_key(self.config.get('openai_api_key'))
         except FileNotFoundError:
             self.show_api_key_dialog()
     def show_api_key_dialog(self):
@@ -38,13 +77,32 @@ class ModernStudyApp(QMainWindow):
         dialog.setLayout(layout)
         dialog.exec_()
     def setup_database(self):
-        self.conn = sqlite3.connect('study_app.db')
+        self.conn = study_db.connect(study_db.DB_PATH)
         self.cursor = self.conn.cursor()
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS playlists (id INTEGER PRIMARY KEY, name TEXT NOT NULL, url TEXT NOT NULL, transcript TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS generated_tests (id INTEGER PRIMARY KEY, playlist_id INTEGER, questions TEXT NOT NULL, answers TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (playlist_id) REFERENCES playlists (id))''')
-        self.conn.commit()
+        self.db_writer = study_db.WriteQueue(study_db.DB_PATH)
+        self.db_write_finished.connect(self.on_db_write_finished)
+        self.metrics = MetricsRecorder(study_db.DB_PATH, window_days=self.config.get('metrics_window_days', 30), retention_days=self.config.get('metrics_retention_days', 90))
+        self.ai_client.metrics = self.metrics
+        self.ai_client.cache = ResponseCache(study_db.DB_PATH, self.config.get('cache_max_entries', 5000), self.config.get('cache_ttl_days', 30) * 24 * 3600)
+        self.search_index = SearchIndex(self.conn)
+        self.note_store = NoteStore(self.config.get('note_snapshot_every', 50), self.config.get('note_keep_snapshots', 10))
+        self.vector_index = VectorIndex(study_db.DB_PATH, self.ai_client)
+        self.request_builder = RequestBuilder(self.config.get('token_budgets'))
+        self.retrieval = RetrievalQA(self.ai_client, self.vector_index, self.config.get('retrieval_top_k', 6), builder=self.request_builder)
+        self.ingestor = TranscriptIngestor(make_fetcher(self.config), study_db.DB_PATH, self.config.get('max_concurrent_requests', 4))
+        self.pipeline = ChunkedPipeline(self.ai_client, self.config.get('chunk_tokens', 2500), self.config.get('max_concurrent_requests', 4), builder=self.request_builder)
+    def write_db(self, fn, *args, on_done=None, error_text="Database write failed"):
+        future = self.db_writer.submit(fn, *args)
+        future.add_done_callback(lambda future: self.db_write_finished.emit(on_done, error_text, future))
+        return future
+    def on_db_write_finished(self, on_done, error_text, future):
+        error = future.exception()
+        if error is not None:
+            QMessageBox.critical(self, "Error", f"{error_text}: {str(error)}")
+        elif on_done is not None:
+            on_done(future.result())
     def setup_styles(self):
-        self.setStyleSheet("""QMainWindow {background-color: #0a0a0a;} QWidget {background-color: #0a0a0a; color: #ffffff; font-family: 'Segoe UI', Arial, sans-serif;} QPushButton {background: rgba(98, 0, 238, 0.8); border: none; border-radius: 8px; color: white; padding: 12px 24px; margin: 4px; font-weight: bold; font-size: 13px;} QPushButton:hover {background: rgba(119, 34, 255, 0.9);} QTextEdit, QListWidget {background-color: rgba(30, 30, 30, 0.7); border: 1px solid rgba(255, 255, 255, 0.1); border-radius: 10px; padding: 12px; color: white; font-size: 14px;} QSplitter::handle {background-color: #2d2d2d; height: 2px; width: 2px;} QSplitter::handle:hover {background-color: #6200EE;} QGroupBox {background-color: rgba(30, 30, 30, 0.5); border: 1px solid rgba(98, 0, 238, 0.3); border-radius: 12px; margin-top: 16px; padding: 20px; font-weight: bold;} QGroupBox::title {subcontrol-origin: margin; left: 12px; padding: 0 8px; color: #6200EE;} QLineEdit {background-color: rgba(30, 30, 30, 0.7); border: 1px solid rgba(255, 255, 255, 0.1); border-radius: 8px; padding: 10px; color: white; font-size: 13px;} QTabWidget::pane {border: 1px solid rgba(98, 0, 238, 0.3); border-radius: 8px; background-color: rgba(30, 30, 30, 0.5);} QTabBar::tab {background-color: rgba(30, 30, 30, 0.7); border-top-left-radius: 8px; border-top-right-radius: 8px; padding: 8px 16px; margin-right: 2px;} QTabBar::tab:selected {background-color: rgba(98, 0, 238, 0.8);}""")
+        self.setStyleSheet("""QMainWindow {background-color: #0a0a0a;} QWidget {background-color: #0a0a0a; color: #ffffff; font-family: 'Segoe UI', Arial, sans-serif;} QPushButton {background: rgba(98, 0, 238, 0.8); border: none; border-radius: 8px; color: white; padding: 12px 24px; margin: 4px; font-weight: bold; font-size: 13px;} QPushButton:hover {background: rgba(119, 34, 255, 0.9);} QTextEdit, QListView {background-color: rgba(30, 30, 30, 0.7); border: 1px solid rgba(255, 255, 255, 0.1); border-radius: 10px; padding: 12px; color: white; font-size: 14px;} QSplitter::handle {background-color: #2d2d2d; height: 2px; width: 2px;} QSplitter::handle:hover {background-color: #6200EE;} QGroupBox {background-color: rgba(30, 30, 30, 0.5); border: 1px solid rgba(98, 0, 238, 0.3); border-radius: 12px; margin-top: 16px; padding: 20px; font-weight: bold;} QGroupBox::title {subcontrol-origin: margin; left: 12px; padding: 0 8px; color: #6200EE;} QLineEdit {background-color: rgba(30, 30, 30, 0.7); border: 1px solid rgba(255, 255, 255, 0.1); border-radius: 8px; padding: 10px; color: white; font-size: 13px;} QTabWidget::pane {border: 1px solid rgba(98, 0, 238, 0.3); border-radius: 8px; background-color: rgba(30, 30, 30, 0.5);} QTabBar::tab {background-color: rgba(30, 30, 30, 0.7); border-top-left-radius: 8px; border-top-right-radius: 8px; padding: 8px 16px; margin-right: 2px;} QTabBar::tab:selected {background-color: rgba(98, 0, 238, 0.8);}""")
     def setup_ui(self):
         self.main_splitter = QSplitter(Qt.Horizontal)
         self.setCentralWidget(self.main_splitter)
@@ -57,14 +115,60 @@ class ModernStudyApp(QMainWindow):
         self.main_splitter.setSizes([600, 800])
         right_splitter.setSizes([400, 500])
         self.setMinimumSize(1400, 900)
+        self.setup_ai_status()
+    def setup_ai_status(self):
+        self.ai_status = QLabel()
+        self.statusBar().addPermanentWidget(self.ai_status)
+        self.cancel_ai_btn = QPushButton("Cancel AI Requests")
+        self.cancel_ai_btn.clicked.connect(self.ai_executor.cancel_all)
+        self.statusBar().addPermanentWidget(self.cancel_ai_btn)
+        self.ai_executor.in_flight_changed.connect(self.update_ai_status)
+        self.update_ai_status(0)
+    def update_ai_status(self, count):
+        self.ai_status.setText(f"AI requests in flight: {count}" if count else "AI idle")
+        self.ai_status.setToolTip("\n".join(self.ai_executor.in_flight()))
+        self.cancel_ai_btn.setEnabled(count > 0)
+    def cache_allowed(self, feature):
+        if QApplication.keyboardModifiers() & Qt.ShiftModifier:
+            return False
+        return feature not in self.config.get('cache_bypass', [])
+    def submit_ai(self, feature, fn, on_result, error_text, stream_to=None):
+        use_cache = self.cache_allowed(feature)
+        stream = None
+        if stream_to is not None and self.config.get('stream_responses', True):
+            stream = StreamBuffer(stream_to, self)
+        return self.ai_executor.submit(feature, partial(fn, use_cache=use_cache), on_result, lambda error: QMessageBox.critical(self, "Error", f"{error_text}: {error}"), stream)
+    def compact_request(self, feature, content):
+        content, stats = self.request_builder.prepare(feature, content)
+        saved = stats['original_tokens'] - stats['tokens']
+        message = f"Prompt: {stats['original_tokens']:,} -> {stats['tokens']:,} tokens"
+        if stats['original_tokens']:
+            message += f" ({saved * 100 // stats['original_tokens']}% smaller)"
+        if stats['tokens'] > stats['budget']:
+            message += f", over the {stats['budget']:,} token budget: " + ("condensing in chunks" if feature != "ask_question" else "sending the most relevant sections")
+        self.statusBar().showMessage(message, 8000)
+        return content
+    def submit_material(self, feature, content, on_result, error_text, stream_to=None, playlist_name=None):
+        content = self.compact_request(feature, content)
+        build_messages = partial(feature_messages, feature, playlist_name=playlist_name)
+        return self.submit_ai(feature, partial(self.pipeline.run, feature, content, build_messages), on_result, error_text, stream_to)
+    def study_material(self, playlist_name):
+        notes = self.note_editor.toPlainText()
+        self.cursor.execute("SELECT transcript FROM playlists WHERE name = ? AND transcript IS NOT NULL", (playlist_name,))
+        transcripts = [read_transcript(row[0]) for row in self.cursor.fetchall() if row[0]]
+        if not transcripts:
+            return notes
+        return "\n\n".join([notes, "Transcript:"] + transcripts)
     def setup_left_panel(self):
         left_widget = QWidget()
         left_layout = QVBoxLayout(left_widget)
         youtube_container = QGroupBox("Video Player")
-        youtube_layout = QVBoxLayout(youtube_container)
-        self.web_view = QWebEngineView()
-        self.web_view.setMinimumSize(640, 360)
-        youtube_layout.addWidget(self.web_view)
+        self.youtube_layout = QVBoxLayout(youtube_container)
+        self.web_view = None
+        self.video_placeholder = QLabel("Select a playlist to start watching")
+        self.video_placeholder.setAlignment(Qt.AlignCenter)
+        self.video_placeholder.setMinimumSize(640, 360)
+        self.youtube_layout.addWidget(self.video_placeholder)
         playlist_group = QGroupBox("Study Playlists")
         playlist_layout = QVBoxLayout(playlist_group)
         add_playlist_widget = QWidget()
@@ -79,21 +183,41 @@ class ModernStudyApp(QMainWindow):
         add_btn.clicked.connect(self.add_playlist)
         add_layout.addWidget(add_btn, 1, 1)
         playlist_layout.addWidget(add_playlist_widget)
-        self.playlist_list = QListWidget()
-        self.playlist_list.setItemDelegate(PlaylistItemDelegate())
-        self.playlist_list.itemClicked.connect(self.play_playlist)
+        self.playlist_filter = QLineEdit()
+        self.playlist_filter.setPlaceholderText("Filter playlists")
+        playlist_layout.addWidget(self.playlist_filter)
+        self.playlist_model = PlaylistModel(self.conn, self)
+        self.playlist_list = QListView()
+        self.playlist_list.setUniformItemSizes(True)
+        self.playlist_list.setModel(self.playlist_model)
+        self.playlist_list.setItemDelegate(PlaylistItemDelegate(self.playlist_list))
+        self.playlist_list.clicked.connect(self.play_playlist)
         playlist_layout.addWidget(self.playlist_list)
+        self.playlist_filter_timer = QTimer(self)
+        self.playlist_filter_timer.setSingleShot(True)
+        self.playlist_filter_timer.setInterval(150)
+        self.playlist_filter_timer.timeout.connect(lambda: self.playlist_model.set_filter(self.playlist_filter.text()))
+        self.playlist_filter.textChanged.connect(lambda: self.playlist_filter_timer.start())
         ai_controls = QGroupBox("AI Tools")
         ai_controls_layout = QVBoxLayout(ai_controls)
         generate_test_btn = QPushButton("Generate Practice Test")
+        generate_test_btn.setToolTip("Shift+click to bypass cached AI responses")
         generate_test_btn.clicked.connect(self.generate_test)
         ai_controls_layout.addWidget(generate_test_btn)
         summarize_btn = QPushButton("Summarize Content")
+        summarize_btn.setToolTip("Shift+click to bypass cached AI responses")
         summarize_btn.clicked.connect(self.summarize_content)
         ai_controls_layout.addWidget(summarize_btn)
         create_flashcards_btn = QPushButton("Create Flashcards")
+        create_flashcards_btn.setToolTip("Shift+click to bypass cached AI responses")
         create_flashcards_btn.clicked.connect(self.create_flashcards)
         ai_controls_layout.addWidget(create_flashcards_btn)
+        review_btn = QPushButton("Review Due Flashcards")
+        review_btn.clicked.connect(lambda: self.show_flashcards_dialog())
+        ai_controls_layout.addWidget(review_btn)
+        batch_btn = QPushButton("Batch Generate...")
+        batch_btn.clicked.connect(self.show_batch_dialog)
+        ai_controls_layout.addWidget(batch_btn)
         left_layout.addWidget(youtube_container)
         left_layout.addWidget(playlist_group)
         left_layout.addWidget(ai_controls)
@@ -105,17 +229,39 @@ class ModernStudyApp(QMainWindow):
         self.note_title = QLineEdit()
         self.note_title.setPlaceholderText("Note title")
         note_controls.addWidget(self.note_title)
+        new_note_btn = QPushButton("New Note")
+        new_note_btn.clicked.connect(self.new_note)
+        note_controls.addWidget(new_note_btn)
         save_btn = QPushButton("Save Note")
         save_btn.setIcon(self.style().standardIcon(QStyle.SP_DialogSaveButton))
+        save_btn.setToolTip("Notes are saved automatically; saving also updates the search index")
         save_btn.clicked.connect(self.save_note)
         note_controls.addWidget(save_btn)
+        history_btn = QPushButton("History...")
+        history_btn.clicked.connect(self.show_note_history)
+        note_controls.addWidget(history_btn)
         analyze_btn = QPushButton("Analyze Notes")
+        analyze_btn.setToolTip("Shift+click to bypass cached AI responses")
         analyze_btn.clicked.connect(self.ai_analyze)
         note_controls.addWidget(analyze_btn)
         top_layout.addLayout(note_controls)
         self.note_editor = QTextEdit()
         self.note_editor.setPlaceholderText("Start taking notes...")
         top_layout.addWidget(self.note_editor)
+        self.note_status = QLabel()
+        top_layout.addWidget(self.note_status)
+        self.current_note_id = None
+        self.note_session = 0
+        self.search_indexed_at = {}
+        self.search_stale = set()
+        self.loading_note = False
+        self.dirty_since = 0.0
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setSingleShot(True)
+        self.autosave_timer.setInterval(self.config.get('autosave_ms', 1000))
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.note_editor.textChanged.connect(self.schedule_autosave)
+        self.note_title.textChanged.connect(self.schedule_autosave)
         return top_widget
     def setup_right_bottom_panel(self):
         bottom_widget = QTabWidget()
@@ -131,6 +277,7 @@ class ModernStudyApp(QMainWindow):
         self.question_input.setPlaceholderText("Ask a question about the content...")
         qa_layout.addWidget(self.question_input)
         ask_btn = QPushButton("Ask Question")
+        ask_btn.setToolTip("Shift+click to bypass cached AI responses")
         ask_btn.clicked.connect(self.ask_question)
         qa_layout.addWidget(ask_btn)
         self.qa_output = QTextEdit()
@@ -142,108 +289,157 @@ class ModernStudyApp(QMainWindow):
         self.test_display = QTextEdit()
         self.test_display.setReadOnly(True)
         test_layout.addWidget(self.test_display)
+        search_widget = QWidget()
+        search_layout = QVBoxLayout(search_widget)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search notes, transcripts and practice tests...")
+        search_layout.addWidget(self.search_input)
+        self.search_results = QListWidget()
+        self.search_results.itemActivated.connect(self.open_search_result)
+        search_layout.addWidget(self.search_results)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(lambda: self.search_timer.start())
         bottom_widget.addTab(ai_analysis_widget, "AI Analysis")
         bottom_widget.addTab(qa_widget, "Q&A Assistant")
         bottom_widget.addTab(test_widget, "Practice Tests")
+        metrics_widget = QWidget()
+        metrics_layout = QVBoxLayout(metrics_widget)
+        self.metrics_table = QTableWidget(0, len(METRIC_COLUMNS))
+        self.metrics_table.setHorizontalHeaderLabels([column.replace("_", " ").capitalize() for column in METRIC_COLUMNS])
+        self.metrics_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.metrics_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        metrics_layout.addWidget(self.metrics_table)
+        metrics_controls = QHBoxLayout()
+        refresh_metrics_btn = QPushButton("Refresh")
+        refresh_metrics_btn.clicked.connect(self.refresh_metrics)
+        metrics_controls.addWidget(refresh_metrics_btn)
+        export_metrics_btn = QPushButton("Export Report")
+        export_metrics_btn.clicked.connect(self.export_metrics)
+        metrics_controls.addWidget(export_metrics_btn)
+        metrics_layout.addLayout(metrics_controls)
+        bottom_widget.addTab(metrics_widget, "Performance")
+        bottom_widget.addTab(search_widget, "Search")
+        bottom_widget.currentChanged.connect(lambda index: self.refresh_metrics() if bottom_widget.widget(index) is metrics_widget else None)
+        self.output_tabs = bottom_widget
         return bottom_widget
+    def refresh_metrics(self):
+        report = self.metrics.summary()
+        self.metrics_table.setRowCount(len(report))
+        for row, entry in enumerate(report):
+            for column, name in enumerate(METRIC_COLUMNS):
+                value = entry[name]
+                item = QTableWidgetItem("" if value is None else f"{value:.0f}" if isinstance(value, float) else str(value))
+                if column:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.metrics_table.setItem(row, column, item)
+    def export_metrics(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export AI Report", "ai_report.json", "JSON (*.json);;CSV (*.csv)")
+        if not path:
+            return
+        try:
+            self.metrics.export(path)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to export report: {str(e)}")
+            return
+        self.statusBar().showMessage(f"Report saved to {path}", 5000)
+    def run_search(self):
+        self.search_results.clear()
+        try:
+            results = self.search_index.search(self.search_input.text())
+        except sqlite3.Error as e:
+            self.statusBar().showMessage(f"Search failed: {str(e)}", 5000)
+            return
+        labels = {'note': "Note", 'transcript': "Transcript", 'test': "Practice Test"}
+        for kind, ref, title, snippet in results:
+            item = QListWidgetItem(f"{labels.get(kind, kind)}: {title}\n{snippet}")
+            item.setData(Qt.UserRole, (kind, ref))
+            self.search_results.addItem(item)
+    def open_search_result(self, item):
+        kind, ref = item.data(Qt.UserRole)
+        if kind == 'note':
+            try:
+                self.open_note(int(ref))
+            except (LookupError, ValueError) as e:
+                QMessageBox.warning(self, "Error", f"Failed to open note: {str(e)}")
+        elif kind == 'transcript':
+            self.cursor.execute("SELECT name, transcript FROM playlists WHERE id = ?", (int(ref),))
+            row = self.cursor.fetchone()
+            if row:
+                self.ai_output.setText(f"Transcript of {row[0]}\n\n{read_transcript(row[1])}")
+                self.output_tabs.setCurrentIndex(0)
+        elif kind == 'test':
+            self.cursor.execute("SELECT questions, answers FROM generated_tests WHERE id = ?", (int(ref),))
+            row = self.cursor.fetchone()
+            if row:
+                self.test_display.setText(f"{row[0]}\nAnswers:\n{row[1]}" if row[1] else row[0])
+                self.output_tabs.setCurrentIndex(2)
     def ask_question(self):
-        if not self.playlist_list.currentItem():
+        playlist_name = self.current_playlist_name()
+        if not playlist_name:
             QMessageBox.warning(self, "Error", "Please select a playlist first")
             return
         question = self.question_input.text()
         if not question:
             QMessageBox.warning(self, "Error", "Please enter a question")
             return
-        try:
-            context = self.note_editor.toPlainText()
-            playlist_name = self.playlist_list.currentItem().text()
-            client = openai.OpenAI()
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a knowledgeable study assistant. Answer questions based on the provided context."},
-                    {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {question}"}
-                ]
-            )
-            answer = response.choices[0].message.content
-            self.qa_output.setText(f"Q: {question}\n\nA: {answer}")
-            self.question_input.clear()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to get answer: {str(e)}")
+        context = self.compact_request("ask_question", self.note_editor.toPlainText())
+        self.qa_output.setText(f"Q: {question}\n\nA: ")
+        self.question_input.clear()
+        self.submit_ai("ask_question", partial(self.retrieval.run, question, context), lambda answer: self.qa_output.setText(f"Q: {question}\n\nA: {answer}"), "Failed to get answer", self.qa_output)
     def generate_test(self):
-        if not self.playlist_list.currentItem():
+        playlist_name = self.current_playlist_name()
+        if not playlist_name:
             QMessageBox.warning(self, "Error", "Please select a playlist first")
             return
-        try:
-            context = self.note_editor.toPlainText()
-            playlist_name = self.playlist_list.currentItem().text()
-            client = openai.OpenAI()
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Create a practice test with 5 questions based on the provided content. Include both questions and answers."},
-                    {"role": "user", "content": f"Content for {playlist_name}:\n{context}"}
-                ]
-            )
-            test_content = response.choices[0].message.content
-            self.test_display.setText(test_content)
-            self.save_generated_test(playlist_name, test_content)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to generate test: {str(e)}")
+        context = self.study_material(playlist_name)
+        self.test_display.clear()
+        self.submit_material("generate_test", context, partial(self.show_generated_test, playlist_name), "Failed to generate test", self.test_display, playlist_name)
+    def show_generated_test(self, playlist_name, test_content):
+        self.test_display.setText(test_content)
+        self.save_generated_test(playlist_name, test_content)
     def summarize_content(self):
-        if not self.playlist_list.currentItem():
+        playlist_name = self.current_playlist_name()
+        if not playlist_name:
             QMessageBox.warning(self, "Error", "Please select a playlist first")
             return
-        try:
-            content = self.note_editor.toPlainText()
-            playlist_name = self.playlist_list.currentItem().text()
-            client = openai.OpenAI()
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Create a concise summary of the provided content, highlighting key points and concepts."},
-                    {"role": "user", "content": f"Content for {playlist_name}:\n{content}"}
-                ]
-            )
-            summary = response.choices[0].message.content
-            self.ai_output.setText(f"Summary of {playlist_name}\n\n{summary}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to summarize content: {str(e)}")
+        content = self.study_material(playlist_name)
+        self.ai_output.setText(f"Summary of {playlist_name}\n\n")
+        self.submit_material("summarize_content", content, lambda summary: self.ai_output.setText(f"Summary of {playlist_name}\n\n{summary}"), "Failed to summarize content", self.ai_output, playlist_name)
     def create_flashcards(self):
-        if not self.playlist_list.currentItem():
+        playlist_name = self.current_playlist_name()
+        if not playlist_name:
             QMessageBox.warning(self, "Error", "Please select a playlist first")
             return
-        try:
-            content = self.note_editor.toPlainText()
-            playlist_name = self.playlist_list.currentItem().text()
-            client = openai.OpenAI()
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Create a set of 10 flashcards based on the content. Format as 'Front: [question/term] | Back: [answer/definition]'"},
-                    {"role": "user", "content": f"Content for {playlist_name}:\n{content}"}
-                ]
-            )
-            flashcards = response.choices[0].message.content
-            self.show_flashcards_dialog(flashcards)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to create flashcards: {str(e)}")
-    def show_flashcards_dialog(self, flashcards):
-        dialog = FlashcardsDialog(flashcards, self)
+        content = self.study_material(playlist_name)
+        self.submit_material("create_flashcards", content, partial(self.save_flashcards, playlist_name), "Failed to create flashcards", playlist_name=playlist_name)
+    def save_flashcards(self, playlist_name, flashcards):
+        self.write_db(store_flashcards, playlist_name, flashcards, on_done=self.flashcards_saved, error_text="Failed to save flashcards")
+    def flashcards_saved(self, result):
+        deck_id, added, updated = result
+        if not added and not updated:
+            QMessageBox.information(self, "Flashcards", "Every generated card is already in this deck; nothing new was stored.")
+            return
+        self.statusBar().showMessage(f"Added {added} new flashcards" + (f", updated {updated}" if updated else ""), 5000)
+        self.show_flashcards_dialog(deck_id)
+    def show_batch_dialog(self):
+        if getattr(self, 'batch_dialog', None) is None:
+            self.batch_dialog = BatchDialog(self)
+        self.batch_dialog.refresh_jobs()
+        self.batch_dialog.show()
+        self.batch_dialog.raise_()
+    def show_flashcards_dialog(self, deck_id=None):
+        dialog = FlashcardsDialog(self, deck_id)
         dialog.exec_()
     def save_generated_test(self, playlist_name, test_content):
-        self.cursor.execute("SELECT id FROM playlists WHERE name = ?", (playlist_name,))
-        playlist_id = self.cursor.fetchone()[0]
-        parts = test_content.split("\nAnswers:\n")
-        questions = parts[0]
-        answers = parts[1] if len(parts) > 1 else ""
-        self.cursor.execute("INSERT INTO generated_tests (playlist_id, questions, answers) VALUES (?, ?, ?)", (playlist_id, questions, answers))
-        self.conn.commit()
+        return self.write_db(store_generated_test, playlist_name, test_content, error_text="Failed to save test")
     def save_api_key(self, api_key, dialog):
-        config = {'openai_api_key': api_key}
+        self.config['openai_api_key'] = api_key
         with open('config.json', 'w') as f:
-            json.dump(config, f)
-        openai.api_key = api_key
+            json.dump(self.config, f)
+        self.ai_client.set_api_key(api_key)
         dialog.accept()
     def add_playlist(self):
         name = self.playlist_name.text()
@@ -254,49 +450,128 @@ class ModernStudyApp(QMainWindow):
         if "youtube.com" not in url and "youtu.be" not in url:
             QMessageBox.warning(self, "Error", "Please enter a valid YouTube URL")
             return
-        self.cursor.execute("INSERT INTO playlists (name, url) VALUES (?, ?)", (name, url))
-        self.conn.commit()
-        self.add_playlist_item(name, url)
+        self.write_db(study_db.insert_playlist, name, url, on_done=partial(self.playlist_added, url), error_text="Failed to add playlist")
         self.playlist_name.clear()
         self.playlist_url.clear()
         video_id = self.extract_video_id(url)
         if video_id:
             self.load_youtube_video(video_id)
+    def playlist_added(self, url, playlist_id):
+        self.playlist_model.refresh()
+        self.ingest_transcript(playlist_id, url)
+    def ingest_transcript(self, playlist_id, url):
+        self.transcript_executor.submit("transcript", lambda cancel_event, on_delta: self.ingestor.ingest(playlist_id, url, cancel_event), self.transcript_ingested, lambda error: self.statusBar().showMessage(f"Transcript download failed: {error}", 8000))
+    def transcript_ingested(self, result):
+        self.statusBar().showMessage(f"Transcripts for {result['name']}: {result['available']} of {result['videos']} videos" + (", will retry the rest on next start" if result['status'] != 'done' else ""), 8000)
+        if result['transcript']:
+            self.ai_executor.submit("index_transcript", lambda cancel_event, on_delta: self.vector_index.index_document('transcript', result['playlist_id'], result['name'], result['transcript']), lambda indexed: None)
     def extract_video_id(self, url):
-        if "v=" in url:
-            return url.split("v=")[1].split("&")[0]
-        elif "youtu.be/" in url:
-            return url.split("youtu.be/")[1].split("?")[0]
-        return None
-    def add_playlist_item(self, name, url):
-        item = QListWidgetItem()
-        item.setText(name)
-        item.setData(Qt.UserRole, url)
-        self.playlist_list.addItem(item)
+        return extract_video_id(url)
+    def current_playlist_name(self):
+        index = self.playlist_list.currentIndex()
+        return index.data() if index.isValid() else None
     def load_playlists(self):
-        self.cursor.execute("SELECT name, url FROM playlists")
-        for name, url in self.cursor.fetchall():
-            self.add_playlist_item(name, url)
+        self.playlist_model.refresh()
     def load_youtube_video(self, video_id):
         html = f"""<html><body style="margin:0;background:#000;"><iframe width="100%" height="100%" src="https://www.youtube.com/embed/{video_id}?rel=0&autoplay=1" frameborder="0" allowfullscreen allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture"></iframe></body></html>"""
-        self.web_view.setHtml(html)
-    def play_playlist(self, item):
-        url = item.data(Qt.UserRole)
+        self.ensure_web_view().setHtml(html)
+    def ensure_web_view(self):
+        if self.web_view is None:
+            from PyQt5.QtWebEngineWidgets import QWebEngineView
+            self.web_view = QWebEngineView()
+            self.web_view.setMinimumSize(640, 360)
+            self.youtube_layout.replaceWidget(self.video_placeholder, self.web_view)
+            self.video_placeholder.deleteLater()
+        return self.web_view
+    def play_playlist(self, index):
+        url = index.data(Qt.UserRole)
         video_id = self.extract_video_id(url)
         if video_id:
             self.load_youtube_video(video_id)
-    def save_note(self):
-        title = self.note_title.text()
+    def schedule_autosave(self):
+        if self.loading_note:
+            return
+        if not self.autosave_timer.isActive():
+            self.dirty_since = time.monotonic()
+            self.note_status.setText("Unsaved changes")
+        elif time.monotonic() - self.dirty_since >= self.config.get('autosave_max_wait_ms', 10000) / 1000:
+            return
+        self.autosave_timer.start()
+    def autosave(self, index=False, search=False):
+        self.autosave_timer.stop()
+        content = self.note_editor.toPlainText()
+        if self.current_note_id is None and not content.strip():
+            return
+        title = self.note_title.text().strip()
         if not title:
             title = f"Note_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        if not os.path.exists("notes"):
-            os.makedirs("notes")
-        content = self.note_editor.toPlainText()
-        with open(f"notes/{title}.txt", "w", encoding="utf-8") as f:
-            f.write(content)
-        QMessageBox.information(self, "Success", "Note saved successfully!")
+            self.loading_note = True
+            self.note_title.setText(title)
+            self.loading_note = False
+        now = time.monotonic()
+        search = search or index or self.current_note_id is None or now - self.search_indexed_at.get(self.current_note_id, 0) >= self.config.get('search_index_interval_s', 30)
+        self.write_db(store_note, self.note_store, self.current_note_id, title, content, self.note_session, search, on_done=partial(self.note_saved, self.note_session, title, content, index, search, now), error_text="Failed to save note")
+    def note_saved(self, session, title, content, index, search, saved_at, result):
+        note_id, version = result
+        if search:
+            self.search_indexed_at[note_id] = saved_at
+            self.search_stale.discard(note_id)
+        else:
+            self.search_stale.add(note_id)
+        if session == self.note_session:
+            self.current_note_id = note_id
+            if not self.autosave_timer.isActive():
+                self.note_status.setText(f"Saved version {version} at {datetime.now().strftime('%H:%M:%S')}")
+        if index:
+            self.ai_executor.submit("index_note", lambda cancel_event, on_delta: self.vector_index.index_document('note', note_id, title, content), lambda result: None)
+            self.statusBar().showMessage("Note saved", 3000)
+    def save_note(self):
+        self.autosave(index=True)
+    def flush_note(self):
+        if self.autosave_timer.isActive() or self.current_note_id in self.search_stale:
+            self.autosave(search=True)
+    def load_note_into_editor(self, note_id, title, content):
+        self.flush_note()
+        self.note_session += 1
+        self.current_note_id = note_id
+        self.loading_note = True
+        self.note_title.setText(title)
+        self.note_editor.setPlainText(content)
+        self.loading_note = False
+        self.note_status.setText("")
+    def new_note(self):
+        self.load_note_into_editor(None, "", "")
+    def open_note(self, note_id):
+        row = self.cursor.execute("SELECT title FROM notes WHERE id = ?", (note_id,)).fetchone()
+        if row is None:
+            raise LookupError(f"No note with id {note_id}")
+        self.load_note_into_editor(note_id, row[0], load_note(self.conn, note_id))
+    def open_latest_note(self):
+        notes = list_notes(self.conn)
+        if notes and self.current_note_id is None and not self.note_editor.toPlainText():
+            self.open_note(notes[0][0])
+    def import_notes(self, conn):
+        imported = self.note_store.import_directory(conn, NOTES_DIR)
+        SearchIndex(conn).rebuild(commit=False)
+        return imported
+    def notes_imported(self, imported):
+        def reindex(cancel_event, on_delta):
+            for path, note_id, title, content in imported:
+                self.vector_index.remove_document('note', path)
+                self.vector_index.index_document('note', note_id, title, content)
+        self.ai_executor.submit("index_note", reindex, lambda result: None)
+        self.statusBar().showMessage(f"Imported {len(imported)} notes from {NOTES_DIR}/", 5000)
+        self.open_latest_note()
+    def show_note_history(self):
+        self.autosave()
+        self.write_db(lambda conn: None, on_done=lambda result: self.open_note_history())
+    def open_note_history(self):
+        if self.current_note_id is None:
+            QMessageBox.information(self, "History", "This note has not been saved yet")
+            return
+        NoteHistoryDialog(self, self.current_note_id).exec_()
     def ai_analyze(self):
-        if not openai.api_key:
+        if not self.ai_client.api_key:
             QMessageBox.warning(self, "Error", "Please set up your OpenAI API key first")
             self.show_api_key_dialog()
             return
@@ -304,20 +579,17 @@ class ModernStudyApp(QMainWindow):
         if not content:
             QMessageBox.warning(self, "Error", "Please enter some notes first")
             return
-        try:
-            client = openai.OpenAI()
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful study assistant. Analyze the student's notes and provide:\n1. Key concepts identified\n2. Areas that need clarification\n3. Suggestions for further study\n4. Learning objectives achieved"},
-                    {"role": "user", "content": f"Please analyze these study notes:\n\n{content}"}
-                ]
-            )
-            analysis = response.choices[0].message.content
-            self.ai_output.setText(analysis)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"AI analysis failed: {str(e)}")
+        self.ai_output.clear()
+        self.submit_material("ai_analyze", content, self.ai_output.setText, "AI analysis failed", self.ai_output)
     def closeEvent(self, event):
+        self.flush_note()
+        self.ai_executor.shutdown()
+        self.transcript_executor.shutdown()
+        self.pipeline.shutdown()
+        self.ai_client.cache.close()
+        self.vector_index.close()
+        self.metrics.close()
+        self.db_writer.close()
         self.conn.close()
         super().closeEvent(event)
     def setup_splitter_controls(self):
@@ -344,15 +616,14 @@ class ModernStudyApp(QMainWindow):
                 if handle:
                     handle.setEnabled(not self.locked)
 class FlashcardsDialog(QDialog):
-    def __init__(self, flashcards_content, parent=None):
-        super().__init__(parent)
+    def __init__(self, app_window, deck_id=None):
+        super().__init__(app_window)
+        self.app_window = app_window
+        self.deck_id = deck_id
         self.setWindowTitle("Study Flashcards")
         self.setMinimumSize(600, 400)
-        self.flashcards = []
-        for line in flashcards_content.split('\n'):
-            if '|' in line:
-                front, back = line.split('|')
-                self.flashcards.append({'front': front.replace('Front:', '').strip(), 'back': back.replace('Back:', '').strip()})
+        self.store = DeckStore(app_window.conn)
+        self.flashcards = self.store.due_cards(deck_id)
         self.current_index = 0
         self.showing_front = True
         self.setup_ui()
@@ -364,41 +635,339 @@ class FlashcardsDialog(QDialog):
         self.card_display.setMinimumHeight(200)
         layout.addWidget(self.card_display)
         controls = QHBoxLayout()
-        prev_btn = QPushButton("Previous")
-        prev_btn.clicked.connect(self.previous_card)
-        controls.addWidget(prev_btn)
         self.flip_btn = QPushButton("Flip")
         self.flip_btn.clicked.connect(self.flip_card)
         controls.addWidget(self.flip_btn)
-        next_btn = QPushButton("Next")
-        next_btn.clicked.connect(self.next_card)
-        controls.addWidget(next_btn)
+        self.grade_btns = []
+        for label, grade in GRADES.items():
+            grade_btn = QPushButton(label.capitalize())
+            grade_btn.clicked.connect(partial(self.grade_card, grade))
+            controls.addWidget(grade_btn)
+            self.grade_btns.append(grade_btn)
         layout.addLayout(controls)
         self.progress_label = QLabel()
         self.progress_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.progress_label)
         self.update_display()
-        self.setup_splitter_controls()
         self.setWindowIcon(QIcon('study_icon.png'))
     def update_display(self):
-        if self.flashcards:
-            card = self.flashcards[self.current_index]
-            content = card['front'] if self.showing_front else card['back']
-            self.card_display.setText(content)
-            self.progress_label.setText(f"Card {self.current_index + 1} of {len(self.flashcards)}")
+        finished = self.current_index >= len(self.flashcards)
+        self.flip_btn.setEnabled(not finished)
+        for grade_btn in self.grade_btns:
+            grade_btn.setEnabled(not finished and not self.showing_front)
+        if finished:
+            next_due = self.store.next_due(self.deck_id)
+            self.card_display.setText("No cards due right now." if self.flashcards else "No cards are due.")
+            self.progress_label.setText(f"Next review {datetime.fromtimestamp(next_due).strftime('%Y-%m-%d %H:%M')}" if next_due else "")
+            return
+        card = self.flashcards[self.current_index]
+        self.card_display.setText(card.front if self.showing_front else card.back)
+        self.progress_label.setText(f"Card {self.current_index + 1} of {len(self.flashcards)} due")
     def flip_card(self):
         self.showing_front = not self.showing_front
         self.update_display()
-    def next_card(self):
-        if self.current_index < len(self.flashcards) - 1:
-            self.current_index += 1
-            self.showing_front = True
-            self.update_display()
-    def previous_card(self):
-        if self.current_index > 0:
-            self.current_index -= 1
-            self.showing_front = True
-            self.update_display()
+    def grade_card(self, grade):
+        card = self.flashcards[self.current_index].review(grade)
+        self.app_window.write_db(save_review, card, error_text="Failed to save review")
+        self.current_index += 1
+        self.showing_front = True
+        self.update_display()
+class NoteHistoryDialog(QDialog):
+    def __init__(self, app_window, note_id):
+        super().__init__(app_window)
+        self.app_window = app_window
+        self.note_id = note_id
+        self.setWindowTitle("Note History")
+        self.setMinimumSize(700, 450)
+        self.setup_ui()
+    def setup_ui(self):
+        layout = QHBoxLayout(self)
+        self.version_list = QListWidget()
+        for version, kind, length, saved_at in note_history(self.app_window.conn, self.note_id):
+            item = QListWidgetItem(f"v{version}  {datetime.fromtimestamp(saved_at).strftime('%Y-%m-%d %H:%M:%S')}  ({length:,} chars)")
+            item.setData(Qt.UserRole, version)
+            self.version_list.addItem(item)
+        self.version_list.currentItemChanged.connect(self.show_version)
+        layout.addWidget(self.version_list, 1)
+        right = QVBoxLayout()
+        self.preview = QTextEdit()
+        self.preview.setReadOnly(True)
+        right.addWidget(self.preview)
+        restore_btn = QPushButton("Restore This Version")
+        restore_btn.clicked.connect(self.restore_version)
+        right.addWidget(restore_btn)
+        layout.addLayout(right, 2)
+        self.setWindowIcon(QIcon('study_icon.png'))
+        if self.version_list.count():
+            self.version_list.setCurrentRow(0)
+    def show_version(self, item):
+        if item is not None:
+            self.preview.setPlainText(load_note(self.app_window.conn, self.note_id, item.data(Qt.UserRole)))
+    def restore_version(self):
+        if self.version_list.currentItem() is None:
+            return
+        self.app_window.note_editor.setPlainText(self.preview.toPlainText())
+        self.app_window.autosave()
+        self.accept()
+class StreamBuffer(QObject):
+    def __init__(self, text_edit, parent=None, interval_ms=60):
+        super().__init__(parent)
+        self.text_edit = text_edit
+        self.pending = []
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+        self.text_edit.destroyed.connect(self.detach)
+    def detach(self):
+        self.timer.stop()
+        self.text_edit = None
+    def append(self, text):
+        self.pending.append(text)
+        if not self.timer.isActive():
+            self.timer.start()
+    def flush(self):
+        if not self.pending or self.text_edit is None:
+            return
+        self.text_edit.moveCursor(QTextCursor.End)
+        self.text_edit.insertPlainText("".join(self.pending))
+        self.pending.clear()
+        self.text_edit.ensureCursorVisible()
+    def finish(self):
+        self.timer.stop()
+        self.flush()
+        self.pending.clear()
+        self.deleteLater()
+class BatchDialog(QDialog):
+    FEATURE_LABELS = {"generate_test": "Practice tests", "summarize_content": "Summaries", "create_flashcards": "Flashcards"}
+    def __init__(self, app_window):
+        super().__init__(app_window)
+        self.app_window = app_window
+        self.request_id = None
+        self.setWindowTitle("Batch Generate")
+        self.setMinimumSize(600, 560)
+        self.runner = BatchRunner(app_window.pipeline, study_db.DB_PATH, app_window.config.get('max_concurrent_requests', 4))
+        layout = QVBoxLayout(self)
+        self.all_playlists = QCheckBox("All playlists")
+        layout.addWidget(self.all_playlists)
+        self.playlist_model = PlaylistModel(app_window.conn, self)
+        self.playlist_view = QListView()
+        self.playlist_view.setUniformItemSizes(True)
+        self.playlist_view.setModel(self.playlist_model)
+        self.playlist_view.setItemDelegate(PlaylistItemDelegate(self.playlist_view))
+        self.playlist_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.playlist_model.refresh()
+        self.all_playlists.toggled.connect(lambda checked: self.playlist_view.setEnabled(not checked))
+        layout.addWidget(self.playlist_view)
+        options = QHBoxLayout()
+        self.feature_boxes = {}
+        for feature in BATCH_FEATURES:
+            box = QCheckBox(self.FEATURE_LABELS[feature])
+            box.setChecked(True)
+            self.feature_boxes[feature] = box
+            options.addWidget(box)
+        self.include_notes = QCheckBox("Include current notes")
+        options.addWidget(self.include_notes)
+        options.addWidget(QLabel("Concurrency"))
+        self.concurrency = QSpinBox()
+        self.concurrency.setRange(1, 16)
+        self.concurrency.setValue(self.runner.concurrency)
+        options.addWidget(self.concurrency)
+        layout.addLayout(options)
+        controls = QHBoxLayout()
+        self.start_btn = QPushButton("Start")
+        self.start_btn.clicked.connect(self.start)
+        controls.addWidget(self.start_btn)
+        self.jobs = QComboBox()
+        controls.addWidget(self.jobs)
+        self.resume_btn = QPushButton("Resume")
+        self.resume_btn.clicked.connect(self.resume)
+        controls.addWidget(self.resume_btn)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.cancel)
+        controls.addWidget(self.cancel_btn)
+        layout.addLayout(controls)
+        self.log = QTextEdit()
+        self.log.setReadOnly(True)
+        layout.addWidget(self.log)
+        self.set_running(False)
+    def refresh_jobs(self):
+        self.jobs.clear()
+        for job_id, features, remaining in self.runner.unfinished_jobs():
+            self.jobs.addItem(f"Job {job_id}: {remaining} remaining", job_id)
+        self.set_running(self.request_id is not None)
+    def set_running(self, running):
+        self.start_btn.setEnabled(not running)
+        self.cancel_btn.setEnabled(running)
+        self.resume_btn.setEnabled(not running and self.jobs.count() > 0)
+    def start(self):
+        features = [feature for feature, box in self.feature_boxes.items() if box.isChecked()]
+        if not features:
+            QMessageBox.warning(self, "Error", "Please choose at least one output")
+            return
+        playlist_ids = None
+        if not self.all_playlists.isChecked():
+            playlist_ids = [index.data(PlaylistModel.IdRole) for index in self.playlist_view.selectionModel().selectedIndexes()]
+            if not playlist_ids:
+                QMessageBox.warning(self, "Error", "Please select playlists or choose All playlists")
+                return
+        self.launch(lambda: self.runner.create_job(features, playlist_ids))
+    def resume(self):
+        job_id = self.jobs.currentData()
+        if job_id is not None:
+            self.launch(lambda: job_id)
+    def launch(self, job):
+        self.runner.concurrency = self.concurrency.value()
+        self.runner.notes = self.app_window.note_editor.toPlainText() if self.include_notes.isChecked() else ""
+        use_cache = self.app_window.cache_allowed('batch')
+        self.log.clear()
+        self.set_running(True)
+        self.request_id = self.app_window.ai_executor.submit("batch", lambda cancel_event, on_delta: self.runner.run(job(), cancel_event, on_delta, use_cache), self.finished, self.failed, StreamBuffer(self.log, self))
+    def cancel(self):
+        if self.request_id is not None:
+            self.app_window.ai_executor.cancel(self.request_id)
+            self.request_id = None
+            self.log.append("Cancelled. Unfinished items can be resumed later.")
+        self.set_running(False)
+        self.refresh_jobs()
+    def finished(self, counts):
+        self.request_id = None
+        self.log.append(f"Job {counts['job_id']}: {counts['done']} done, {counts['failed']} failed, {counts['skipped']} skipped")
+        self.set_running(False)
+        self.refresh_jobs()
+    def failed(self, message):
+        self.request_id = None
+        self.log.append(f"Batch failed: {message}")
+        self.set_running(False)
+        self.refresh_jobs()
+class AIRequestSignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    delta = pyqtSignal(int, str)
+class AIRequest(QRunnable):
+    def __init__(self, request_id, label, fn, streaming=False):
+        super().__init__()
+        self.request_id = request_id
+        self.label = label
+        self.fn = fn
+        self.streaming = streaming
+        self.cancel_event = threading.Event()
+        self.signals = AIRequestSignals()
+        self.setAutoDelete(False)
+    def run(self):
+        try:
+            result = self.fn(self.cancel_event, self.emit_delta if self.streaming else None)
+        except RequestCancelled:
+            self.signals.failed.emit(self.request_id, "cancelled")
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, str(e))
+        else:
+            self.signals.finished.emit(self.request_id, result)
+    def emit_delta(self, text):
+        self.signals.delta.emit(self.request_id, text)
+class AIRequestExecutor(QObject):
+    in_flight_changed = pyqtSignal(int)
+    def __init__(self, max_workers=4, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, int(max_workers)))
+        self.requests = {}
+        self.next_id = 0
+    def submit(self, label, fn, on_result, on_error=None, stream=None):
+        self.next_id += 1
+        request = AIRequest(self.next_id, label, fn, stream is not None)
+        request.signals.finished.connect(self.on_finished)
+        request.signals.failed.connect(self.on_failed)
+        request.signals.delta.connect(self.on_delta)
+        self.requests[request.request_id] = (request, on_result, on_error, stream)
+        self.pool.start(request)
+        self.in_flight_changed.emit(len(self.requests))
+        return request.request_id
+    def in_flight(self):
+        return [f"#{request_id} {entry[0].label}" + (" (cancelling)" if entry[0].cancel_event.is_set() else "") for request_id, entry in self.requests.items()]
+    def cancel(self, request_id):
+        entry = self.requests.get(request_id)
+        if not entry:
+            return
+        entry[0].cancel_event.set()
+        if self.pool.tryTake(entry[0]):
+            self.settle(request_id)
+        else:
+            self.in_flight_changed.emit(len(self.requests))
+    def cancel_all(self):
+        for request_id in list(self.requests):
+            self.cancel(request_id)
+    def shutdown(self, timeout_ms=2000):
+        self.cancel_all()
+        self.pool.waitForDone(timeout_ms)
+    def settle(self, request_id):
+        entry = self.requests.pop(request_id, None)
+        self.in_flight_changed.emit(len(self.requests))
+        if entry is not None and entry[3] is not None:
+            entry[3].finish()
+        if entry is None or entry[0].cancel_event.is_set():
+            return None
+        return entry
+    @pyqtSlot(int, str)
+    def on_delta(self, request_id, text):
+        entry = self.requests.get(request_id)
+        if entry and entry[3] and not entry[0].cancel_event.is_set():
+            entry[3].append(text)
+    @pyqtSlot(int, object)
+    def on_finished(self, request_id, result):
+        entry = self.settle(request_id)
+        if entry:
+            entry[1](result)
+    @pyqtSlot(int, str)
+    def on_failed(self, request_id, message):
+        entry = self.settle(request_id)
+        if entry and entry[2]:
+            entry[2](message)
+class PlaylistModel(QAbstractListModel):
+    IdRole = Qt.UserRole + 1
+    def __init__(self, conn, parent=None, page_size=200):
+        super().__init__(parent)
+        self.conn = conn
+        self.page_size = page_size
+        self.filter_text = ""
+        self.rows = []
+        self.exhausted = False
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        playlist_id, name, url = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return name
+        if role == Qt.UserRole:
+            return url
+        if role == PlaylistModel.IdRole:
+            return playlist_id
+        return None
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+    def fetch_page(self):
+        return study_db.playlist_page(self.conn, self.rows[-1] if self.rows else None, self.filter_text, self.page_size)
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        page = self.fetch_page()
+        if len(page) < self.page_size:
+            self.exhausted = True
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+            self.rows.extend(page)
+            self.endInsertRows()
+    def refresh(self):
+        self.beginResetModel()
+        self.rows = []
+        self.exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+    def set_filter(self, text):
+        self.filter_text = text.strip()
+        self.refresh()
 class PlaylistItemDelegate(QStyledItemDelegate):
     def paint(self, painter, option, index):
         if option.state & QStyle.State_Selected:
@@ -409,9 +978,15 @@ class PlaylistItemDelegate(QStyledItemDelegate):
         painter.setPen(QColor("white"))
         painter.drawText(option.rect.adjusted(10, 0, -10, 0), Qt.AlignVCenter | Qt.AlignLeft, text)
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["batch"]:
+        sys.exit(batch_main(sys.argv[2:]))
+    startup_timer = PhaseTimer(STARTED_AT)
+    startup_timer.mark("imports")
+    QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
+    QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
-    app.setAttribute(Qt.AA_EnableHighDpiScaling)
     app.setStyle("Fusion")
-    window = ModernStudyApp()
+    startup_timer.mark("qt application")
+    window = ModernStudyApp(startup_timer)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
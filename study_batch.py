@@ -0,0 +1,216 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+import study_db
+from study_flashcards import DeckStore, parse_flashcards
+from study_metrics import MetricsRecorder
+from study_core import AIClient, ChunkedPipeline, RequestBuilder, RequestCancelled, ResponseCache, compact_text, feature_messages, read_transcript, store_generated_test
+BATCH_FEATURES = ("generate_test", "summarize_content", "create_flashcards")
+OUTPUT_KINDS = {"summarize_content": "summary", "create_flashcards": "flashcards"}
+RETRYABLE_ERRORS = ("RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError")
+def is_retryable(error):
+    status = getattr(error, 'status_code', None)
+    if status in (408, 409, 429) or (status is not None and status >= 500):
+        return True
+    return type(error).__name__ in RETRYABLE_ERRORS
+def retry_after(error):
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+class Backoff:
+    def __init__(self, base_delay=2.0, max_delay=60.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.resume_at = 0.0
+        self._lock = threading.Lock()
+    def delay(self, attempt, error):
+        delay = retry_after(error)
+        if delay is None:
+            delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        if getattr(error, 'status_code', None) == 429 or type(error).__name__ == "RateLimitError":
+            with self._lock:
+                self.resume_at = max(self.resume_at, time.monotonic() + delay)
+        return delay
+    def wait(self, seconds=0.0, cancel_event=None):
+        with self._lock:
+            until = max(self.resume_at, time.monotonic() + seconds)
+        while True:
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                return
+            if cancel_event is not None:
+                if cancel_event.wait(min(remaining, 0.5)):
+                    raise RequestCancelled("batch")
+            else:
+                time.sleep(min(remaining, 0.5))
+def save_batch_result(conn, item_id, attempts, playlist_id, playlist_name, feature, content):
+    if feature == "generate_test":
+        store_generated_test(conn, playlist_name, content)
+    else:
+        study_db.insert_study_output(conn, playlist_id, OUTPUT_KINDS[feature], content)
+    if feature == "create_flashcards":
+        cards = parse_flashcards(content)
+        if cards:
+            store = DeckStore(conn)
+            store.add_cards(store.deck_for_playlist(playlist_id, playlist_name), cards)
+    study_db.update_batch_item(conn, item_id, 'done', attempts)
+class BatchRunner:
+    def __init__(self, pipeline, db_path=study_db.DB_PATH, concurrency=4, max_retries=4, notes="", backoff=None):
+        self.pipeline = pipeline
+        self.db_path = db_path
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.notes = notes
+        self.backoff = backoff or Backoff()
+    def create_job(self, features, playlist_ids=None):
+        features = [feature for feature in BATCH_FEATURES if feature in features]
+        conn = study_db.connect(self.db_path)
+        try:
+            with conn:
+                job_id = conn.execute("INSERT INTO batch_jobs (features) VALUES (?)", (",".join(features),)).lastrowid
+                for feature in features:
+                    if playlist_ids is None:
+                        conn.execute("INSERT INTO batch_items (job_id, playlist_id, feature) SELECT ?, id, ? FROM playlists", (job_id, feature))
+                    else:
+                        conn.executemany("INSERT OR IGNORE INTO batch_items (job_id, playlist_id, feature) VALUES (?, ?, ?)", [(job_id, playlist_id, feature) for playlist_id in playlist_ids])
+            return job_id
+        finally:
+            conn.close()
+    def unfinished_jobs(self):
+        conn = study_db.connect(self.db_path)
+        try:
+            return conn.execute("SELECT j.id, j.features, COUNT(i.id) FROM batch_jobs j JOIN batch_items i ON i.job_id = j.id AND i.status IN ('pending', 'failed') GROUP BY j.id ORDER BY j.id").fetchall()
+        finally:
+            conn.close()
+    def run(self, job_id, cancel_event=None, on_progress=None, use_cache=True):
+        if cancel_event is None:
+            cancel_event = threading.Event()
+        conn = study_db.connect(self.db_path)
+        try:
+            items = conn.execute("SELECT i.id, i.feature, i.attempts, p.id, p.name, p.transcript FROM batch_items i JOIN playlists p ON p.id = i.playlist_id WHERE i.job_id = ? AND i.status IN ('pending', 'failed') ORDER BY i.id", (job_id,)).fetchall()
+            conn.execute("UPDATE batch_jobs SET status = 'running' WHERE id = ?", (job_id,))
+            conn.commit()
+        finally:
+            conn.close()
+        counts = {'done': 0, 'failed': 0, 'skipped': 0}
+        writer = study_db.WriteQueue(self.db_path)
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as pool:
+                futures = {pool.submit(self.process, item, writer, cancel_event, use_cache): item for item in items}
+                try:
+                    for future in as_completed(futures):
+                        feature, name = futures[future][1], futures[future][4]
+                        try:
+                            status, detail, write = future.result()
+                        except RequestCancelled:
+                            continue
+                        try:
+                            write.result()
+                        except Exception as e:
+                            status, detail = 'failed', f"could not save: {e}"
+                        counts[status] += 1
+                        if on_progress is not None:
+                            on_progress(f"[{sum(counts.values())}/{len(items)}] {feature} for {name}: {status}{' (' + detail + ')' if detail else ''}\n")
+                except BaseException:
+                    cancel_event.set()
+                    raise
+                finally:
+                    for future in futures:
+                        future.cancel()
+            writer.flush()
+            status = 'cancelled' if cancel_event.is_set() else 'failed' if counts['failed'] else 'done'
+            writer.submit(lambda conn: conn.execute("UPDATE batch_jobs SET status = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?", (status, job_id))).result()
+        finally:
+            writer.close()
+        counts['job_id'] = job_id
+        return counts
+    def process(self, item, writer, cancel_event, use_cache):
+        item_id, feature, attempts, playlist_id, playlist_name, transcript = item
+        try:
+            material = compact_text("\n\n".join(part for part in (self.notes, read_transcript(transcript)) if part))
+        except Exception as e:
+            return 'failed', f"unreadable transcript: {e}", writer.submit(study_db.update_batch_item, item_id, 'failed', attempts, f"unreadable transcript: {e}")
+        if not material.strip():
+            return 'skipped', "no notes or transcript", writer.submit(study_db.update_batch_item, item_id, 'skipped', attempts, "no notes or transcript")
+        build_messages = partial(feature_messages, feature, playlist_name=playlist_name)
+        for attempt in range(self.max_retries + 1):
+            self.backoff.wait(0.0, cancel_event)
+            attempts += 1
+            try:
+                content = self.pipeline.run(feature, material, build_messages, cancel_event, None, use_cache)
+            except RequestCancelled:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    return 'failed', str(e), writer.submit(study_db.update_batch_item, item_id, 'failed', attempts, str(e))
+                self.backoff.wait(self.backoff.delay(attempt, e), cancel_event)
+            else:
+                return 'done', "", writer.submit(save_batch_result, item_id, attempts, playlist_id, playlist_name, feature, content)
+def batch_main(argv=None):
+    parser = argparse.ArgumentParser(prog="lambda.py batch", description="Generate practice tests, summaries and flashcards for many playlists without opening the window.")
+    parser.add_argument("--features", nargs="+", choices=BATCH_FEATURES, default=list(BATCH_FEATURES))
+    parser.add_argument("--playlists", nargs="+", metavar="NAME", help="playlist names to process (default: all playlists)")
+    parser.add_argument("--notes-file", help="notes to include alongside each playlist transcript")
+    parser.add_argument("--concurrency", type=int, help="number of playlists processed at once")
+    parser.add_argument("--retries", type=int, default=4, help="retries per item on rate limits and transient errors")
+    parser.add_argument("--resume", type=int, metavar="JOB_ID", help="resume an unfinished job instead of starting a new one")
+    parser.add_argument("--list-jobs", action="store_true", help="list unfinished jobs and exit")
+    parser.add_argument("--no-cache", action="store_true", help="bypass cached AI responses")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--db", default=study_db.DB_PATH)
+    args = parser.parse_args(argv)
+    try:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = {}
+    concurrency = args.concurrency or config.get('max_concurrent_requests', 4)
+    notes = ""
+    if args.notes_file:
+        with open(args.notes_file, 'r', encoding="utf-8") as f:
+            notes = f.read()
+    cache = ResponseCache(args.db, config.get('cache_max_entries', 5000), config.get('cache_ttl_days', 30) * 24 * 3600)
+    metrics = MetricsRecorder(args.db)
+    client = AIClient(config.get('openai_api_key'), cache=cache, metrics=metrics)
+    pipeline = ChunkedPipeline(client, config.get('chunk_tokens', 2500), concurrency, builder=RequestBuilder(config.get('token_budgets')))
+    runner = BatchRunner(pipeline, args.db, concurrency, args.retries, notes)
+    try:
+        if args.list_jobs:
+            for job_id, features, remaining in runner.unfinished_jobs():
+                print(f"job {job_id}: {features} ({remaining} items remaining)")
+            return 0
+        job_id = args.resume
+        if job_id is None:
+            playlist_ids = None
+            if args.playlists:
+                conn = study_db.connect(args.db)
+                try:
+                    playlist_ids = [study_db.playlist_id(conn, name) for name in args.playlists]
+                except LookupError as e:
+                    print(str(e), file=sys.stderr)
+                    return 2
+                finally:
+                    conn.close()
+            job_id = runner.create_job(args.features, playlist_ids)
+        print(f"running batch job {job_id}")
+        cancel_event = threading.Event()
+        try:
+            counts = runner.run(job_id, cancel_event, partial(print, end="", flush=True), not args.no_cache)
+        except KeyboardInterrupt:
+            cancel_event.set()
+            print(f"interrupted; resume with --resume {job_id}", file=sys.stderr)
+            return 130
+        print(f"job {job_id}: {counts['done']} done, {counts['failed']} failed, {counts['skipped']} skipped")
+        return 1 if counts['failed'] else 0
+    finally:
+        pipeline.shutdown()
+        cache.close()
+        metrics.close()
@@ -0,0 +1,549 @@
+import threading
+import hashlib
+import json
+import re
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import study_db
+from study_notes import list_notes, load_note
+MODEL = "gpt-3.5-turbo"
+EMBEDDING_MODEL = "text-embedding-3-small"
+SYSTEM_PROMPTS = {
+    "ask_question": "You are a knowledgeable study assistant. Answer questions based on the provided context.",
+    "generate_test": "Create a practice test with 5 questions based on the provided content. Include both questions and answers.",
+    "summarize_content": "Create a concise summary of the provided content, highlighting key points and concepts.",
+    "create_flashcards": "Create a set of 10 flashcards based on the content. Format as 'Front: [question/term] | Back: [answer/definition]'",
+    "ai_analyze": "You are a helpful study assistant. Analyze the student's notes and provide:\n1. Key concepts identified\n2. Areas that need clarification\n3. Suggestions for further study\n4. Learning objectives achieved",
+}
+TOKEN_BUDGETS = {"ask_question": 3000, "generate_test": 6000, "summarize_content": 6000, "create_flashcards": 6000, "ai_analyze": 6000}
+HEADING = re.compile(r"#{1,6} \S|\d+(?:\.\d+)*[.)] \S|[^\n]{1,80}:$|[A-Z0-9][A-Z0-9 ,&/-]{2,60}$")
+CONDENSE_PROMPT = "Extract the key points, facts, definitions and concepts from this section of study material. Keep every detail a student would need; omit filler."
+class RequestCancelled(Exception):
+    pass
+class PhaseTimer:
+    def __init__(self, started_at=None):
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.last = self.started_at
+        self.phases = []
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+    def total_ms(self):
+        return (self.last - self.started_at) * 1000
+    def report(self, target_ms=None):
+        lines = [f"{phase:<16}{ms:9.1f} ms" for phase, ms in self.phases]
+        lines.append(f"{'total':<16}{self.total_ms():9.1f} ms")
+        if target_ms is not None and self.total_ms() > target_ms:
+            lines.append(f"startup exceeded the {target_ms} ms target")
+        return "\n".join(lines)
+def feature_messages(feature, content, playlist_name=None, question=None):
+    if feature == "ask_question":
+        user = f"Context:\n{content}\n\nQuestion: {question}"
+    elif feature == "ai_analyze":
+        user = f"Please analyze these study notes:\n\n{content}"
+    else:
+        user = f"Content for {playlist_name}:\n{content}"
+    return [
+        {"role": "system", "content": SYSTEM_PROMPTS[feature]},
+        {"role": "user", "content": user}
+    ]
+class ResponseCache:
+    def __init__(self, path, max_entries=5000, ttl_seconds=30 * 24 * 3600, memory_entries=128):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.writes = 0
+        self._lock = threading.Lock()
+        self.conn = study_db.connect(path, check_same_thread=False)
+    @staticmethod
+    def make_key(model, messages):
+        payload = json.dumps([model, [[m["role"], m["content"]] for m in messages]], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    def remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self.memory.move_to_end(key)
+                return entry[0]
+            row = self.conn.execute("SELECT response, created_at FROM ai_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self.memory.pop(key, None)
+                self.conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE ai_cache SET last_used = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.remember(key, row)
+            return row[0]
+    def put(self, key, feature, response):
+        now = time.time()
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO ai_cache (key, feature, response, created_at, last_used) VALUES (?, ?, ?, ?, ?)", (key, feature, response, now, now))
+            self.remember(key, (response, now))
+            self.writes += 1
+            if self.writes % 50 == 1:
+                self.evict(now)
+            self.conn.commit()
+    def evict(self, now=None):
+        now = time.time() if now is None else now
+        self.conn.execute("DELETE FROM ai_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        self.conn.execute("DELETE FROM ai_cache WHERE key IN (SELECT key FROM ai_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+            self.conn.execute("DELETE FROM ai_cache")
+            self.conn.commit()
+    def close(self):
+        with self._lock:
+            self.conn.close()
+class AIClient:
+    def __init__(self, api_key=None, model=MODEL, base_url=None, cache=None, metrics=None):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.cache = cache
+        self.metrics = metrics
+        self._client = None
+        self._lock = threading.Lock()
+    def set_api_key(self, api_key):
+        with self._lock:
+            self.api_key = api_key
+            self._client = None
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                import openai
+                self._client = openai.OpenAI(api_key=self.api_key, base_url=self.base_url)
+            return self._client
+    def record(self, feature, model, started, call, cache_hit=False, error=None):
+        if self.metrics is None:
+            return
+        now = time.perf_counter()
+        first_token = call.get('first_token') or (now if error is None else None)
+        usage = call.get('usage')
+        if isinstance(error, RequestCancelled):
+            error = "cancelled"
+        elif error is not None:
+            error = f"{type(error).__name__}: {error}"[:500]
+        self.metrics.record(feature, model, (now - started) * 1000, (first_token - started) * 1000 if first_token else None, getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None), cache_hit, error)
+    def embed(self, texts, model=EMBEDDING_MODEL):
+        started = time.perf_counter()
+        call = {}
+        try:
+            response = self.client().embeddings.create(model=model, input=texts)
+        except Exception as e:
+            self.record("embeddings", model, started, call, error=e)
+            raise
+        call['usage'] = getattr(response, 'usage', None)
+        self.record("embeddings", model, started, call)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    def complete(self, feature, messages, cancel_event=None, on_delta=None, use_cache=True):
+        if cancel_event is not None and cancel_event.is_set():
+            raise RequestCancelled(feature)
+        started = time.perf_counter()
+        call = {}
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(self.model, messages)
+            if use_cache:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.record(feature, self.model, started, call, cache_hit=True)
+                    return cached
+        try:
+            if on_delta is not None:
+                content = self.stream(feature, messages, cancel_event, on_delta, call)
+            else:
+                response = self.client().chat.completions.create(model=self.model, messages=messages)
+                call['usage'] = response.usage
+                if cancel_event is not None and cancel_event.is_set():
+                    raise RequestCancelled(feature)
+                content = response.choices[0].message.content
+        except Exception as e:
+            self.record(feature, self.model, started, call, error=e)
+            raise
+        self.record(feature, self.model, started, call)
+        if key is not None and content:
+            self.cache.put(key, feature, content)
+        return content
+    def stream(self, feature, messages, cancel_event, on_delta, call=None):
+        call = {} if call is None else call
+        parts = []
+        response = self.client().chat.completions.create(model=self.model, messages=messages, stream=True, stream_options={"include_usage": True})
+        try:
+            for chunk in response:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise RequestCancelled(feature)
+                if getattr(chunk, 'usage', None) is not None:
+                    call['usage'] = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if 'first_token' not in call:
+                        call['first_token'] = time.perf_counter()
+                    parts.append(delta)
+                    on_delta(delta)
+        finally:
+            close = getattr(response, 'close', None)
+            if close:
+                close()
+        return "".join(parts)
+class SearchIndex:
+    def __init__(self, conn):
+        self.conn = conn
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM search_docs LIMIT 1").fetchone() is None
+    def index_document(self, kind, ref, title, body, commit=True):
+        ref = str(ref)
+        row = self.conn.execute("SELECT id FROM search_docs WHERE kind = ? AND ref = ?", (kind, ref)).fetchone()
+        if row is None:
+            doc_id = self.conn.execute("INSERT INTO search_docs (kind, ref, title) VALUES (?, ?, ?)", (kind, ref, title)).lastrowid
+        else:
+            doc_id = row[0]
+            self.conn.execute("UPDATE search_docs SET title = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (title, doc_id))
+            self.conn.execute("DELETE FROM search_fts WHERE rowid = ?", (doc_id,))
+        self.conn.execute("INSERT INTO search_fts (rowid, title, body) VALUES (?, ?, ?)", (doc_id, title or "", body or ""))
+        if commit:
+            self.conn.commit()
+        return doc_id
+    def remove_document(self, kind, ref, commit=True):
+        row = self.conn.execute("SELECT id FROM search_docs WHERE kind = ? AND ref = ?", (kind, str(ref))).fetchone()
+        if row is not None:
+            self.conn.execute("DELETE FROM search_fts WHERE rowid = ?", row)
+            self.conn.execute("DELETE FROM search_docs WHERE id = ?", row)
+        if commit:
+            self.conn.commit()
+    @staticmethod
+    def build_query(text):
+        terms = re.findall(r"\w+", text)
+        if not terms:
+            return None
+        return " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+    def search(self, text, limit=50):
+        query = self.build_query(text)
+        if query is None:
+            return []
+        return self.conn.execute('''SELECT d.kind, d.ref, d.title, snippet(search_fts, 1, '[', ']', '...', 12) FROM search_fts JOIN search_docs d ON d.id = search_fts.rowid WHERE search_fts MATCH ? ORDER BY rank LIMIT ?''', (query, limit)).fetchall()
+    def rebuild(self, commit=True):
+        self.conn.execute("DELETE FROM search_fts")
+        self.conn.execute("DELETE FROM search_docs")
+        for kind, ref, title, body in library_documents(self.conn):
+            self.index_document(kind, ref, title, body, commit=False)
+        if commit:
+            self.conn.commit()
+def split_test(test_content):
+    parts = test_content.split("\nAnswers:\n")
+    return parts[0], parts[1] if len(parts) > 1 else ""
+def store_generated_test(conn, playlist_name, test_content):
+    questions, answers = split_test(test_content)
+    test_id = study_db.insert_generated_test(conn, playlist_name, questions, answers)
+    SearchIndex(conn).index_document("test", test_id, f"{playlist_name} practice test", f"{questions}\n{answers}", commit=False)
+    return test_id
+def store_note(conn, store, note_id, title, text, draft=None, search=True):
+    note_id, version = store.save(conn, note_id, title, text, draft=draft)
+    if search:
+        SearchIndex(conn).index_document("note", note_id, title, text, commit=False)
+    return note_id, version
+def read_transcript(value):
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode("utf-8")
+    return value
+def library_documents(conn, kinds=("note", "transcript", "test")):
+    if "note" in kinds:
+        for note_id, title, updated_at in list_notes(conn):
+            yield "note", note_id, title, load_note(conn, note_id)
+    if "transcript" in kinds:
+        for playlist_id, name, transcript in conn.execute("SELECT id, name, transcript FROM playlists WHERE transcript IS NOT NULL").fetchall():
+            yield "transcript", playlist_id, name, read_transcript(transcript)
+    if "test" in kinds:
+        for test_id, name, questions, answers in conn.execute("SELECT t.id, p.name, t.questions, t.answers FROM generated_tests t LEFT JOIN playlists p ON p.id = t.playlist_id").fetchall():
+            yield "test", test_id, f"{name} practice test", f"{questions}\n{answers}"
+class VectorIndex:
+    def __init__(self, path, client, model=EMBEDDING_MODEL, chunk_tokens=300, batch_size=64):
+        self.client = client
+        self.model = model
+        self.chunk_tokens = chunk_tokens
+        self.batch_size = batch_size
+        self.matrix = None
+        self._lock = threading.Lock()
+        self.conn = study_db.connect(path, check_same_thread=False)
+    def content_hash(self, text):
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+    def embeddings(self, texts):
+        import numpy as np
+        hashes = [self.content_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                rows = self.conn.execute(f"SELECT content_hash, vector FROM embeddings WHERE content_hash IN ({','.join('?' * len(batch))})", batch).fetchall()
+                found.update((content_hash, np.frombuffer(vector, dtype=np.float32)) for content_hash, vector in rows)
+        missing = list({content_hash: text for content_hash, text in zip(hashes, texts) if content_hash not in found}.items())
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            vectors = [np.asarray(vector, dtype=np.float32) for vector in self.client.embed([text for _, text in batch], self.model)]
+            with self._lock:
+                self.conn.executemany("INSERT OR REPLACE INTO embeddings (content_hash, dim, vector) VALUES (?, ?, ?)", [(content_hash, len(vector), vector.tobytes()) for (content_hash, _), vector in zip(batch, vectors)])
+                self.conn.commit()
+            found.update((content_hash, vector) for (content_hash, _), vector in zip(batch, vectors))
+        return hashes, [found[content_hash] for content_hash in hashes]
+    def index_document(self, kind, ref, title, text):
+        ref = str(ref)
+        chunks = split_chunks(text, self.chunk_tokens)
+        hashes, _ = self.embeddings(chunks)
+        with self._lock:
+            current = [row[0] for row in self.conn.execute("SELECT content_hash FROM passages WHERE kind = ? AND ref = ? ORDER BY position", (kind, ref))]
+            if current == hashes:
+                return
+            self.conn.execute("DELETE FROM passages WHERE kind = ? AND ref = ?", (kind, ref))
+            self.conn.executemany("INSERT INTO passages (kind, ref, title, position, content_hash, text) VALUES (?, ?, ?, ?, ?, ?)", [(kind, ref, title, position, content_hash, chunk) for position, (content_hash, chunk) in enumerate(zip(hashes, chunks))])
+            self.conn.commit()
+            self.matrix = None
+    def remove_document(self, kind, ref):
+        with self._lock:
+            self.conn.execute("DELETE FROM passages WHERE kind = ? AND ref = ?", (kind, str(ref)))
+            self.conn.commit()
+            self.matrix = None
+    def backfill(self, cancel_event=None):
+        with self._lock:
+            indexed = set(self.conn.execute("SELECT DISTINCT kind, ref FROM passages"))
+            documents = [document for document in library_documents(self.conn, ("note", "transcript")) if (document[0], str(document[1])) not in indexed]
+        for kind, ref, title, body in documents:
+            if cancel_event is not None and cancel_event.is_set():
+                raise RequestCancelled("index_library")
+            self.index_document(kind, ref, title, body)
+        return len(documents)
+    def load_matrix(self):
+        import numpy as np
+        if self.matrix is None:
+            rows = self.conn.execute("SELECT p.id, e.vector FROM passages p JOIN embeddings e ON e.content_hash = p.content_hash").fetchall()
+            ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            matrix = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) if rows else np.zeros((0, 0), dtype=np.float32)
+            if rows:
+                matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            self.matrix = (ids, matrix)
+        return self.matrix
+    def search(self, query, k=6):
+        import numpy as np
+        _, vectors = self.embeddings([query])
+        query_vector = vectors[0] / max(float(np.linalg.norm(vectors[0])), 1e-12)
+        with self._lock:
+            ids, matrix = self.load_matrix()
+            if not len(ids):
+                return []
+            scores = matrix @ query_vector
+            k = min(k, len(ids))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            rows = {row[0]: row[1:] for row in self.conn.execute(f"SELECT id, kind, ref, title, text FROM passages WHERE id IN ({','.join('?' * k)})", [int(ids[i]) for i in top])}
+        return [rows[int(ids[i])] + (float(scores[i]),) for i in top if int(ids[i]) in rows]
+    def close(self):
+        with self._lock:
+            self.conn.close()
+class RetrievalQA:
+    def __init__(self, client, index, top_k=6, builder=None):
+        self.client = client
+        self.index = index
+        self.top_k = top_k
+        self.builder = builder or RequestBuilder()
+    def context(self, question, editor_text):
+        if editor_text.strip():
+            self.index.index_document("editor", "current", "Current notes", editor_text)
+        else:
+            self.index.remove_document("editor", "current")
+        passages = self.index.search(question, self.top_k)
+        return "\n\n".join(f"[{title}]\n{text}" for kind, ref, title, text, score in passages)
+    def run(self, question, editor_text, cancel_event=None, on_delta=None, use_cache=True):
+        try:
+            context = self.context(question, editor_text)
+        except ImportError:
+            context = editor_text
+        if cancel_event is not None and cancel_event.is_set():
+            raise RequestCancelled("ask_question")
+        return self.client.complete("ask_question", self.builder.messages("ask_question", compact_text(context), question=question), cancel_event, on_delta, use_cache)
+def estimate_tokens(text):
+    return (len(text) + 3) // 4
+_encoding = None
+_encoding_lock = threading.Lock()
+def count_tokens(text):
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.encoding_for_model(MODEL)
+                except Exception:
+                    _encoding = False
+    if _encoding is False:
+        return estimate_tokens(text)
+    return len(_encoding.encode(text, disallowed_special=()))
+def compact_text(text):
+    lines = []
+    seen = set()
+    previous = None
+    for line in text.splitlines():
+        indent = line[:len(line) - len(line.lstrip(" \t"))]
+        line = re.sub(r"\s+", " ", line).strip()
+        if not line:
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        key = line.casefold()
+        if key == previous or (len(key) >= 40 and key in seen):
+            continue
+        previous = key
+        seen.add(key)
+        lines.append(indent + line)
+    return "\n".join(lines).strip()
+def truncate_to_budget(text, budget):
+    if count_tokens(text) <= budget:
+        return text
+    blocks = []
+    for block in re.split(r"\n\s*\n", text):
+        block = block.strip()
+        if block:
+            blocks.extend(split_paragraph(block, max(budget // 4, 1)) if estimate_tokens(block) > budget // 4 else [block])
+    sizes = [count_tokens(block) + 4 for block in blocks]
+    keep = set()
+    used = 0
+    for i, block in enumerate(blocks):
+        if "\n" not in block and HEADING.match(block) and used + sizes[i] <= budget // 5:
+            keep.add(i)
+            used += sizes[i]
+    head_budget = used + (budget - used) * 2 // 3
+    for i in range(len(blocks)):
+        if i in keep:
+            continue
+        if used + sizes[i] > head_budget:
+            break
+        keep.add(i)
+        used += sizes[i]
+    for i in reversed(range(len(blocks))):
+        if i in keep:
+            continue
+        if used + sizes[i] > budget:
+            break
+        keep.add(i)
+        used += sizes[i]
+    parts = []
+    omitted = 0
+    for i, block in enumerate(blocks):
+        if i in keep:
+            if omitted:
+                parts.append(f"[... {omitted} section{'s' if omitted > 1 else ''} omitted ...]")
+                omitted = 0
+            parts.append(block)
+        else:
+            omitted += 1
+    if omitted:
+        parts.append(f"[... {omitted} section{'s' if omitted > 1 else ''} omitted ...]")
+    return "\n\n".join(parts)
+class RequestBuilder:
+    def __init__(self, budgets=None, default_budget=6000):
+        self.budgets = dict(TOKEN_BUDGETS, **(budgets or {}))
+        self.default_budget = default_budget
+    def budget(self, feature):
+        return self.budgets.get(feature.split(":")[0], self.default_budget)
+    def prepare(self, feature, content):
+        compacted = compact_text(content)
+        return compacted, {'feature': feature, 'original_tokens': count_tokens(content), 'tokens': count_tokens(compacted), 'budget': self.budget(feature)}
+    def fit(self, feature, content):
+        return truncate_to_budget(content, self.budget(feature))
+    def messages(self, feature, content, playlist_name=None, question=None):
+        return feature_messages(feature, self.fit(feature, content), playlist_name, question)
+def split_paragraph(paragraph, max_tokens):
+    pieces = []
+    current = []
+    size = 0
+    for word in re.split(r"(?<=\s)", paragraph):
+        word_tokens = estimate_tokens(word)
+        if current and size + word_tokens > max_tokens:
+            pieces.append("".join(current).strip())
+            current = []
+            size = 0
+        while word_tokens > max_tokens:
+            pieces.append(word[:max_tokens * 4])
+            word = word[max_tokens * 4:]
+            word_tokens = estimate_tokens(word)
+        current.append(word)
+        size += word_tokens
+    if current and "".join(current).strip():
+        pieces.append("".join(current).strip())
+    return pieces
+def split_chunks(text, max_tokens=2500):
+    paragraphs = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) > max_tokens:
+            paragraphs.extend(split_paragraph(paragraph, max_tokens))
+        else:
+            paragraphs.append(paragraph)
+    chunks = []
+    current = []
+    size = 0
+    for paragraph in paragraphs:
+        tokens = estimate_tokens(paragraph) + 1
+        if current and size + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current = []
+            size = 0
+        current.append(paragraph)
+        size += tokens
+        # Cut on content-defined boundaries once a chunk is half full, so an edit only
+        # shifts the chunks around it instead of every chunk after it.
+        if size >= max_tokens // 2 and zlib.crc32(paragraph.encode("utf-8")) % 4 == 0:
+            chunks.append("\n\n".join(current))
+            current = []
+            size = 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+class ChunkedPipeline:
+    def __init__(self, client, max_chunk_tokens=2500, workers=4, max_rounds=3, builder=None):
+        self.client = client
+        self.builder = builder or RequestBuilder()
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_rounds = max_rounds
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chunk")
+    def condense_chunk(self, feature, chunk, cancel_event, use_cache):
+        return self.client.complete(f"{feature}:map", [
+            {"role": "system", "content": CONDENSE_PROMPT},
+            {"role": "user", "content": chunk}
+        ], cancel_event, None, use_cache)
+    def condense(self, feature, content, cancel_event=None, use_cache=True):
+        for _ in range(self.max_rounds):
+            if count_tokens(content) <= self.builder.budget(feature):
+                break
+            chunks = split_chunks(content, self.max_chunk_tokens)
+            if len(chunks) <= 1:
+                break
+            futures = [self.executor.submit(self.condense_chunk, feature, chunk, cancel_event, use_cache) for chunk in chunks]
+            try:
+                content = "\n\n".join(future.result() for future in futures)
+            finally:
+                for future in futures:
+                    future.cancel()
+            if cancel_event is not None and cancel_event.is_set():
+                raise RequestCancelled(feature)
+        return content
+    def run(self, feature, content, build_messages, cancel_event=None, on_delta=None, use_cache=True):
+        content = self.condense(feature, content, cancel_event, use_cache)
+        return self.client.complete(feature, build_messages(self.builder.fit(feature, content)), cancel_event, on_delta, use_cache)
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,200 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+DB_PATH = 'study_app.db'
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 134217728",
+)
+MIGRATIONS = [
+    [
+        '''CREATE TABLE IF NOT EXISTS playlists (id INTEGER PRIMARY KEY, name TEXT NOT NULL, url TEXT NOT NULL, transcript TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS generated_tests (id INTEGER PRIMARY KEY, playlist_id INTEGER, questions TEXT NOT NULL, answers TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (playlist_id) REFERENCES playlists (id))''',
+    ],
+    [
+        '''CREATE INDEX IF NOT EXISTS idx_playlists_name ON playlists (name)''',
+        '''CREATE INDEX IF NOT EXISTS idx_generated_tests_playlist ON generated_tests (playlist_id)''',
+    ],
+    [
+        '''CREATE TABLE IF NOT EXISTS ai_cache (key TEXT PRIMARY KEY, feature TEXT, response TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)''',
+        '''CREATE INDEX IF NOT EXISTS idx_ai_cache_last_used ON ai_cache (last_used)''',
+    ],
+    [
+        '''CREATE TABLE IF NOT EXISTS search_docs (id INTEGER PRIMARY KEY, kind TEXT NOT NULL, ref TEXT NOT NULL, title TEXT, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, UNIQUE (kind, ref))''',
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(title, body, tokenize = 'porter unicode61')''',
+    ],
+    [
+        '''CREATE TABLE IF NOT EXISTS embeddings (content_hash TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL)''',
+        '''CREATE TABLE IF NOT EXISTS passages (id INTEGER PRIMARY KEY, kind TEXT NOT NULL, ref TEXT NOT NULL, title TEXT, position INTEGER NOT NULL, content_hash TEXT NOT NULL, text TEXT NOT NULL)''',
+        '''CREATE INDEX IF NOT EXISTS idx_passages_doc ON passages (kind, ref)''',
+    ],
+    [
+        '''CREATE TABLE IF NOT EXISTS study_outputs (id INTEGER PRIMARY KEY, playlist_id INTEGER NOT NULL, kind TEXT NOT NULL, content TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (playlist_id) REFERENCES playlists (id))''',
+        '''CREATE INDEX IF NOT EXISTS idx_study_outputs_playlist ON study_outputs (playlist_id, kind)''',
+        '''CREATE TABLE IF NOT EXISTS batch_jobs (id INTEGER PRIMARY KEY, features TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, finished_at TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS batch_items (id INTEGER PRIMARY KEY, job_id INTEGER NOT NULL, playlist_id INTEGER NOT NULL, feature TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, error TEXT, UNIQUE (job_id, playlist_id, feature), FOREIGN KEY (job_id) REFERENCES batch_jobs (id))''',
+        '''CREATE INDEX IF NOT EXISTS idx_batch_items_status ON batch_items (job_id, status)''',
+    ],
+    [
+        '''ALTER TABLE playlists ADD COLUMN transcript_status TEXT''',
+        '''CREATE INDEX IF NOT EXISTS idx_playlists_transcript_status ON playlists (transcript_status)''',
+        '''CREATE TABLE IF NOT EXISTS transcript_segments (id INTEGER PRIMARY KEY, playlist_id INTEGER NOT NULL, video_id TEXT NOT NULL, position INTEGER NOT NULL, transcript BLOB NOT NULL, fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, UNIQUE (playlist_id, video_id), FOREIGN KEY (playlist_id) REFERENCES playlists (id))''',
+    ],
+    [
+        '''CREATE TABLE IF NOT EXISTS flashcard_decks (id INTEGER PRIMARY KEY, playlist_id INTEGER UNIQUE, name TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (playlist_id) REFERENCES playlists (id))''',
+        '''CREATE TABLE IF NOT EXISTS flashcards (id INTEGER PRIMARY KEY, deck_id INTEGER NOT NULL, front TEXT NOT NULL, back TEXT NOT NULL, ease REAL NOT NULL DEFAULT 2.5, interval REAL NOT NULL DEFAULT 0, repetitions INTEGER NOT NULL DEFAULT 0, lapses INTEGER NOT NULL DEFAULT 0, due_at REAL NOT NULL, UNIQUE (deck_id, front), FOREIGN KEY (deck_id) REFERENCES flashcard_decks (id))''',
+        '''CREATE INDEX IF NOT EXISTS idx_flashcards_due ON flashcards (due_at)''',
+        '''CREATE INDEX IF NOT EXISTS idx_flashcards_deck_due ON flashcards (deck_id, due_at)''',
+    ],
+    [
+        '''CREATE TABLE IF NOT EXISTS ai_metrics (id INTEGER PRIMARY KEY, feature TEXT NOT NULL, model TEXT, started_at REAL NOT NULL, latency_ms REAL NOT NULL, ttft_ms REAL, prompt_tokens INTEGER, completion_tokens INTEGER, cache_hit INTEGER NOT NULL DEFAULT 0, error TEXT)''',
+        '''CREATE INDEX IF NOT EXISTS idx_ai_metrics_feature ON ai_metrics (feature, started_at)''',
+    ],
+    [
+        '''CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY, title TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, version INTEGER NOT NULL)''',
+        '''CREATE INDEX IF NOT EXISTS idx_notes_updated ON notes (updated_at)''',
+        '''CREATE TABLE IF NOT EXISTS note_versions (note_id INTEGER NOT NULL, version INTEGER NOT NULL, kind TEXT NOT NULL, data BLOB NOT NULL, length INTEGER NOT NULL, saved_at REAL NOT NULL, PRIMARY KEY (note_id, version), FOREIGN KEY (note_id) REFERENCES notes (id)) WITHOUT ROWID''',
+    ],
+    [
+        '''CREATE TABLE IF NOT EXISTS transcript_failures (playlist_id INTEGER NOT NULL, video_id TEXT NOT NULL, attempts INTEGER NOT NULL, permanent INTEGER NOT NULL DEFAULT 0, error TEXT, PRIMARY KEY (playlist_id, video_id), FOREIGN KEY (playlist_id) REFERENCES playlists (id)) WITHOUT ROWID''',
+    ],
+    [
+        '''CREATE INDEX IF NOT EXISTS idx_ai_metrics_started ON ai_metrics (started_at)''',
+    ],
+]
+SELECT_PLAYLIST_ID = "SELECT id FROM playlists WHERE name = ? ORDER BY id LIMIT 1"
+INSERT_PLAYLIST = "INSERT INTO playlists (name, url, transcript_status) VALUES (?, ?, 'pending')"
+INSERT_GENERATED_TEST = "INSERT INTO generated_tests (playlist_id, questions, answers) VALUES (?, ?, ?)"
+INSERT_STUDY_OUTPUT = "INSERT INTO study_outputs (playlist_id, kind, content) VALUES (?, ?, ?)"
+UPDATE_BATCH_ITEM = "UPDATE batch_items SET status = ?, attempts = ?, error = ? WHERE id = ?"
+def connect(path=DB_PATH, check_same_thread=True):
+    conn = sqlite3.connect(path, timeout=5.0, check_same_thread=check_same_thread, cached_statements=256)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    migrate(conn)
+    return conn
+def migrate(conn):
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+        return
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for statements in MIGRATIONS[version:]:
+                for statement in statements:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.isolation_level = isolation_level
+def playlist_id(conn, name):
+    row = conn.execute(SELECT_PLAYLIST_ID, (name,)).fetchone()
+    if row is None:
+        raise LookupError(f"No playlist named {name!r}")
+    return row[0]
+def playlist_page(conn, after=None, filter_text="", limit=200):
+    sql = "SELECT id, name, url FROM playlists"
+    conditions = []
+    params = []
+    if after is not None:
+        conditions.append("(name, id) > (?, ?)")
+        params += [after[1], after[0]]
+    if filter_text:
+        escaped = filter_text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions.append("name LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY name, id LIMIT ?"
+    params.append(limit)
+    return conn.execute(sql, params).fetchall()
+def insert_playlist(conn, name, url):
+    return conn.execute(INSERT_PLAYLIST, (name, url)).lastrowid
+def insert_generated_test(conn, playlist_name, questions, answers):
+    return conn.execute(INSERT_GENERATED_TEST, (playlist_id(conn, playlist_name), questions, answers)).lastrowid
+def insert_study_output(conn, playlist_id, kind, content):
+    return conn.execute(INSERT_STUDY_OUTPUT, (playlist_id, kind, content)).lastrowid
+def update_batch_item(conn, item_id, status, attempts, error=None):
+    conn.execute(UPDATE_BATCH_ITEM, (status, attempts, error, item_id))
+class WriteQueue:
+    def __init__(self, path=DB_PATH, max_batch=256, max_delay=0.02):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="db-writer", daemon=True)
+        self.thread.start()
+    def submit(self, fn, *args):
+        future = Future()
+        self.queue.put((future, fn, args))
+        return future
+    def flush(self, timeout=None):
+        return self.submit(lambda conn: None).result(timeout)
+    def close(self, timeout=5.0):
+        self.queue.put(None)
+        self.thread.join(timeout)
+    def next_batch(self):
+        item = self.queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                self.queue.put(None)
+                break
+            batch.append(item)
+        return batch
+    def run(self):
+        conn = connect(self.path)
+        conn.isolation_level = None
+        try:
+            while True:
+                batch = self.next_batch()
+                if batch is None:
+                    return
+                results = []
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    for future, fn, args in batch:
+                        if not future.set_running_or_notify_cancel():
+                            continue
+                        conn.execute("SAVEPOINT item")
+                        try:
+                            results.append((future, fn(conn, *args), None))
+                            conn.execute("RELEASE item")
+                        except Exception as e:
+                            conn.execute("ROLLBACK TO item")
+                            conn.execute("RELEASE item")
+                            results.append((future, None, e))
+                    conn.execute("COMMIT")
+                except Exception as e:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    for future, fn, args in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for future, result, error in results:
+                    if error is None:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(error)
+        finally:
+            conn.close()
@@ -0,0 +1,108 @@
+import re
+import time
+import study_db
+DAY = 86400
+RELEARN_DELAY = 600
+LABEL = re.compile(r"^(front|back|question|answer|term|definition|q|a)(?:\s*:|\s+[-–]\s)\s*", re.I)
+BULLET = re.compile(r"^\s*(?:[-*•]+|\d+\s*[.)]|card\s*\d+\s*[:.)])\s*", re.I)
+FRONT_LABELS = ("front", "question", "term", "q")
+BACK_LABELS = ("back", "answer", "definition", "a")
+GRADES = {"again": 1, "hard": 3, "good": 4, "easy": 5}
+class Card:
+    __slots__ = ("id", "deck_id", "front", "back", "ease", "interval", "repetitions", "lapses", "due_at")
+    def __init__(self, id, deck_id, front, back, ease=2.5, interval=0.0, repetitions=0, lapses=0, due_at=0.0):
+        self.id = id
+        self.deck_id = deck_id
+        self.front = front
+        self.back = back
+        self.ease = ease
+        self.interval = interval
+        self.repetitions = repetitions
+        self.lapses = lapses
+        self.due_at = due_at
+    def review(self, grade, now=None):
+        now = time.time() if now is None else now
+        if grade < 3:
+            self.repetitions = 0
+            self.interval = 0.0
+            self.lapses += 1
+            self.due_at = now + RELEARN_DELAY
+        else:
+            if self.repetitions == 0:
+                self.interval = 1.0
+            elif self.repetitions == 1:
+                self.interval = 6.0
+            else:
+                self.interval = round(self.interval * self.ease, 2)
+            self.repetitions += 1
+            self.due_at = now + self.interval * DAY
+        self.ease = max(1.3, self.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+        return self
+def split_label(text):
+    text = text.replace("**", "").replace("__", "").strip()
+    match = LABEL.match(text)
+    if match is None:
+        return None, text
+    return match.group(1).lower(), text[match.end():].strip()
+def parse_flashcards(text):
+    cards = []
+    front = None
+    for line in text.splitlines():
+        line = BULLET.sub("", line).strip()
+        if not line:
+            continue
+        if "|" in line:
+            left, right = line.split("|", 1)
+            left_label, left = split_label(left)
+            right_label, right = split_label(right.strip(" |"))
+            if left_label in BACK_LABELS and right_label in FRONT_LABELS:
+                left, right = right, left
+            if left and right:
+                cards.append((left, right))
+            front = None
+            continue
+        label, value = split_label(line)
+        if label in FRONT_LABELS:
+            front = value
+        elif label in BACK_LABELS and front:
+            if value:
+                cards.append((front, value))
+            front = None
+    return cards
+class DeckStore:
+    def __init__(self, conn):
+        self.conn = conn
+    def deck_for_playlist(self, playlist_id, name):
+        row = self.conn.execute("SELECT id FROM flashcard_decks WHERE playlist_id = ?", (playlist_id,)).fetchone()
+        if row is not None:
+            return row[0]
+        return self.conn.execute("INSERT INTO flashcard_decks (playlist_id, name) VALUES (?, ?)", (playlist_id, name)).lastrowid
+    def add_cards(self, deck_id, cards, now=None):
+        now = time.time() if now is None else now
+        before = self.conn.execute("SELECT COUNT(*) FROM flashcards WHERE deck_id = ?", (deck_id,)).fetchone()[0]
+        changed = self.conn.executemany("INSERT INTO flashcards (deck_id, front, back, due_at) VALUES (?, ?, ?, ?) ON CONFLICT (deck_id, front) DO UPDATE SET back = excluded.back WHERE back != excluded.back", [(deck_id, front, back, now) for front, back in cards]).rowcount
+        added = self.conn.execute("SELECT COUNT(*) FROM flashcards WHERE deck_id = ?", (deck_id,)).fetchone()[0] - before
+        return added, changed - added
+    def due_cards(self, deck_id=None, limit=200, now=None):
+        now = time.time() if now is None else now
+        if deck_id is None:
+            rows = self.conn.execute("SELECT id, deck_id, front, back, ease, interval, repetitions, lapses, due_at FROM flashcards WHERE due_at <= ? ORDER BY due_at LIMIT ?", (now, limit))
+        else:
+            rows = self.conn.execute("SELECT id, deck_id, front, back, ease, interval, repetitions, lapses, due_at FROM flashcards WHERE deck_id = ? AND due_at <= ? ORDER BY due_at LIMIT ?", (deck_id, now, limit))
+        return [Card(*row) for row in rows]
+    def next_due(self, deck_id=None):
+        if deck_id is None:
+            return self.conn.execute("SELECT MIN(due_at) FROM flashcards").fetchone()[0]
+        return self.conn.execute("SELECT MIN(due_at) FROM flashcards WHERE deck_id = ?", (deck_id,)).fetchone()[0]
+    def save_review(self, card):
+        self.conn.execute("UPDATE flashcards SET ease = ?, interval = ?, repetitions = ?, lapses = ?, due_at = ? WHERE id = ?", (card.ease, card.interval, card.repetitions, card.lapses, card.due_at, card.id))
+def store_flashcards(conn, playlist_name, text):
+    cards = parse_flashcards(text)
+    if not cards:
+        raise ValueError("No flashcards could be read from the response")
+    store = DeckStore(conn)
+    deck_id = store.deck_for_playlist(study_db.playlist_id(conn, playlist_name), playlist_name)
+    added, updated = store.add_cards(deck_id, cards)
+    return deck_id, added, updated
+def save_review(conn, card):
+    DeckStore(conn).save_review(card)
@@ -0,0 +1,68 @@
+import csv
+import json
+import threading
+import time
+import study_db
+COLUMNS = ("feature", "calls", "cache_hits", "errors", "p50_ms", "p95_ms", "p99_ms", "avg_ttft_ms", "prompt_tokens", "completion_tokens")
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+class MetricsRecorder:
+    def __init__(self, path=study_db.DB_PATH, flush_every=20, window_days=30, retention_days=90):
+        self.flush_every = flush_every
+        self.window_days = window_days
+        self.retention_days = retention_days
+        self.pruned_at = 0.0
+        self.pending = []
+        self._lock = threading.Lock()
+        self.conn = study_db.connect(path, check_same_thread=False)
+    def record(self, feature, model, latency_ms, ttft_ms=None, prompt_tokens=None, completion_tokens=None, cache_hit=False, error=None):
+        with self._lock:
+            self.pending.append((feature, model, time.time() - latency_ms / 1000, latency_ms, ttft_ms, prompt_tokens, completion_tokens, int(cache_hit), error))
+            if len(self.pending) >= self.flush_every:
+                self._flush()
+    def _flush(self):
+        if self.pending:
+            self.conn.executemany("INSERT INTO ai_metrics (feature, model, started_at, latency_ms, ttft_ms, prompt_tokens, completion_tokens, cache_hit, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self.pending)
+            self.conn.commit()
+            self.pending = []
+        if self.retention_days is not None and time.time() - self.pruned_at >= 3600:
+            self.prune()
+    def prune(self):
+        self.pruned_at = time.time()
+        removed = self.conn.execute("DELETE FROM ai_metrics WHERE started_at < ?", (self.pruned_at - self.retention_days * 86400,)).rowcount
+        self.conn.commit()
+        return removed
+    def flush(self):
+        with self._lock:
+            self._flush()
+    def summary(self, since=None):
+        if since is None:
+            since = time.time() - self.window_days * 86400 if self.window_days is not None else 0
+        with self._lock:
+            self._flush()
+            rows = self.conn.execute("SELECT feature, COUNT(*), SUM(cache_hit), SUM(error IS NOT NULL), AVG(CASE WHEN cache_hit = 0 AND error IS NULL THEN ttft_ms END), SUM(prompt_tokens), SUM(completion_tokens) FROM ai_metrics WHERE started_at >= ? GROUP BY feature ORDER BY feature", (since,)).fetchall()
+            latencies = {}
+            for feature, latency in self.conn.execute("SELECT feature, latency_ms FROM ai_metrics WHERE started_at >= ? AND cache_hit = 0 AND error IS NULL ORDER BY feature, latency_ms", (since,)):
+                latencies.setdefault(feature, []).append(latency)
+        report = []
+        for feature, calls, cache_hits, errors, avg_ttft, prompt_tokens, completion_tokens in rows:
+            values = latencies.get(feature, [])
+            report.append(dict(zip(COLUMNS, (feature, calls, cache_hits or 0, errors or 0, percentile(values, 0.5), percentile(values, 0.95), percentile(values, 0.99), avg_ttft, prompt_tokens or 0, completion_tokens or 0))))
+        return report
+    def export(self, path, since=None):
+        report = self.summary(since)
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=COLUMNS)
+                writer.writeheader()
+                writer.writerows(report)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"generated_at": time.time(), "features": report}, f, indent=2)
+        return report
+    def close(self):
+        with self._lock:
+            self._flush()
+            self.conn.close()
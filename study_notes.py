@@ -0,0 +1,123 @@
+import json
+import os
+import time
+import zlib
+NOTES_DIR = "notes"
+def common_prefix(a, b):
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+def common_suffix(a, b, limit):
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+def text_delta(old, new):
+    start = common_prefix(old, new)
+    suffix = common_suffix(old, new, min(len(old), len(new)) - start)
+    return start, len(old) - suffix, new[start:len(new) - suffix]
+def apply_delta(text, delta):
+    start, end, inserted = delta
+    return text[:start] + inserted + text[end:]
+def encode_snapshot(text):
+    return zlib.compress(text.encode("utf-8"), 6)
+def encode_delta(delta):
+    return zlib.compress(json.dumps(delta, ensure_ascii=False).encode("utf-8"), 6)
+def reconstruct(conn, note_id, version=None):
+    if version is None:
+        row = conn.execute("SELECT version FROM notes WHERE id = ?", (note_id,)).fetchone()
+        if row is None:
+            raise LookupError(f"No note with id {note_id}")
+        version = row[0]
+    base = conn.execute("SELECT version, data FROM note_versions WHERE note_id = ? AND kind = 'snapshot' AND version <= ? ORDER BY version DESC LIMIT 1", (note_id, version)).fetchone()
+    if base is None:
+        raise LookupError(f"Version {version} of note {note_id} is no longer available")
+    text = zlib.decompress(base[1]).decode("utf-8")
+    chain = 0
+    for (data,) in conn.execute("SELECT data FROM note_versions WHERE note_id = ? AND version > ? AND version <= ? ORDER BY version", (note_id, base[0], version)):
+        text = apply_delta(text, json.loads(zlib.decompress(data)))
+        chain += 1
+    return text, chain
+def load_note(conn, note_id, version=None):
+    return reconstruct(conn, note_id, version)[0]
+def note_history(conn, note_id):
+    return conn.execute("SELECT version, kind, length, saved_at FROM note_versions WHERE note_id = ? ORDER BY version DESC", (note_id,)).fetchall()
+def list_notes(conn):
+    return conn.execute("SELECT id, title, updated_at FROM notes ORDER BY updated_at DESC").fetchall()
+class NoteStore:
+    def __init__(self, snapshot_every=50, keep_snapshots=10, compact_every=200):
+        self.snapshot_every = snapshot_every
+        self.keep_snapshots = keep_snapshots
+        self.compact_every = compact_every
+        self.heads = {}
+        self.drafts = {}
+        self.saves = 0
+    def head(self, conn, note_id):
+        row = conn.execute("SELECT version FROM notes WHERE id = ?", (note_id,)).fetchone()
+        if row is None:
+            raise LookupError(f"No note with id {note_id}")
+        head = self.heads.get(note_id)
+        if head is None or head[0] != row[0]:
+            text, chain = reconstruct(conn, note_id, row[0])
+            head = self.heads[note_id] = (row[0], text, chain)
+        return head
+    def create(self, conn, title, text="", now=None):
+        now = time.time() if now is None else now
+        note_id = conn.execute("INSERT INTO notes (title, created_at, updated_at, version) VALUES (?, ?, ?, 1)", (title, now, now)).lastrowid
+        conn.execute("INSERT INTO note_versions (note_id, version, kind, data, length, saved_at) VALUES (?, 1, 'snapshot', ?, ?, ?)", (note_id, encode_snapshot(text), len(text), now))
+        self.heads[note_id] = (1, text, 0)
+        return note_id
+    def save(self, conn, note_id, title, text, now=None, draft=None):
+        if note_id is None and draft is not None:
+            note_id = self.drafts.get(draft)
+            if note_id is not None and conn.execute("SELECT 1 FROM notes WHERE id = ?", (note_id,)).fetchone() is None:
+                note_id = None
+        if note_id is None:
+            note_id = self.create(conn, title, text, now)
+            if draft is not None:
+                self.drafts[draft] = note_id
+            return note_id, 1
+        now = time.time() if now is None else now
+        version, head, chain = self.head(conn, note_id)
+        conn.execute("UPDATE notes SET title = ? WHERE id = ? AND title != ?", (title, note_id, title))
+        if text == head:
+            return note_id, version
+        delta = text_delta(head, text)
+        version += 1
+        if chain + 1 >= self.snapshot_every or len(delta[2]) * 2 > len(text):
+            kind, data, chain = 'snapshot', encode_snapshot(text), 0
+        else:
+            kind, data, chain = 'delta', encode_delta(delta), chain + 1
+        conn.execute("INSERT INTO note_versions (note_id, version, kind, data, length, saved_at) VALUES (?, ?, ?, ?, ?, ?)", (note_id, version, kind, data, len(text), now))
+        conn.execute("UPDATE notes SET version = ?, updated_at = ? WHERE id = ?", (version, now, note_id))
+        self.heads[note_id] = (version, text, chain)
+        self.saves += 1
+        if self.saves % self.compact_every == 0:
+            self.compact(conn, note_id)
+        return note_id, version
+    def compact(self, conn, note_id=None):
+        note_ids = [note_id] if note_id is not None else [row[0] for row in conn.execute("SELECT id FROM notes")]
+        removed = 0
+        for note_id in note_ids:
+            row = conn.execute("SELECT version FROM note_versions WHERE note_id = ? AND kind = 'snapshot' ORDER BY version DESC LIMIT 1 OFFSET ?", (note_id, self.keep_snapshots - 1)).fetchone()
+            if row is not None:
+                removed += conn.execute("DELETE FROM note_versions WHERE note_id = ? AND version < ?", (note_id, row[0])).rowcount
+        return removed
+    def import_directory(self, conn, notes_dir=NOTES_DIR):
+        imported = []
+        for name in sorted(os.listdir(notes_dir)):
+            if name.endswith(".txt"):
+                path = f"{notes_dir}/{name}"
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                imported.append((path, self.create(conn, name[:-4], text, os.path.getmtime(path)), name[:-4], text))
+        return imported
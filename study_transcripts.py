@@ -0,0 +1,126 @@
+import json
+import os
+import re
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import study_db
+from study_core import RequestCancelled, SearchIndex, read_transcript
+def extract_video_id(url):
+    if "v=" in url:
+        return url.split("v=")[1].split("&")[0]
+    elif "youtu.be/" in url:
+        return url.split("youtu.be/")[1].split("?")[0]
+    return None
+def extract_playlist_id(url):
+    match = re.search(r"[?&]list=([\w-]+)", url)
+    return match.group(1) if match else None
+CAPTION_NOISE = re.compile(r"\[(?:music|applause|laughter|inaudible|silence)\]|^\(?(?:\d{1,2}:)?\d{1,2}:\d{2}\)?\s", re.I | re.M)
+BOILERPLATE = re.compile(r"(?:please )?(?:don't forget to )?(?:like and subscribe(?: to (?:the|my|our|this) channel)?|subscribe to (?:the|my|our|this) channel)[.!]*|thanks? (?:you )?for watching[.!]*", re.I)
+def clean_transcript(text):
+    text = BOILERPLATE.sub("", CAPTION_NOISE.sub("", text))
+    return "\n".join(line for line in (re.sub(r"[ \t]+", " ", line).strip() for line in text.splitlines()) if line)
+def compress_transcript(text):
+    return zlib.compress(text.encode("utf-8"), 6)
+class YouTubeTranscriptFetcher:
+    def __init__(self, languages=("en",), timeout=15):
+        self.languages = list(languages)
+        self.timeout = timeout
+    def list_videos(self, url):
+        playlist_id = extract_playlist_id(url)
+        if playlist_id is None:
+            video_id = extract_video_id(url)
+            return [video_id] if video_id else []
+        request = urllib.request.Request(f"https://www.youtube.com/playlist?list={playlist_id}", headers={"User-Agent": "Mozilla/5.0", "Accept-Language": "en"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            html = response.read().decode("utf-8", "replace")
+        return list(dict.fromkeys(re.findall(r'"videoId":"([\w-]{11})"', html)))
+    def fetch(self, video_id):
+        from youtube_transcript_api import YouTubeTranscriptApi
+        if hasattr(YouTubeTranscriptApi, 'get_transcript'):
+            return " ".join(segment['text'] for segment in YouTubeTranscriptApi.get_transcript(video_id, languages=self.languages))
+        return " ".join(snippet.text for snippet in YouTubeTranscriptApi().fetch(video_id, languages=self.languages))
+class LocalTranscriptFetcher:
+    def __init__(self, root):
+        self.root = root
+    def list_videos(self, url):
+        playlist_id = extract_playlist_id(url)
+        if playlist_id is not None:
+            path = os.path.join(self.root, f"{playlist_id}.json")
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        video_id = extract_video_id(url)
+        return [video_id] if video_id else []
+    def fetch(self, video_id):
+        with open(os.path.join(self.root, f"{video_id}.txt"), "r", encoding="utf-8") as f:
+            return f.read()
+def make_fetcher(config):
+    if config.get('transcript_dir'):
+        return LocalTranscriptFetcher(config['transcript_dir'])
+    return YouTubeTranscriptFetcher(config.get('transcript_languages', ["en"]))
+PERMANENT_ERRORS = ("FileNotFoundError", "TranscriptsDisabled", "NoTranscriptFound", "NoTranscriptAvailable", "VideoUnavailable", "InvalidVideoId", "AgeRestricted")
+def is_permanent(error):
+    return type(error).__name__ in PERMANENT_ERRORS
+class TranscriptIngestor:
+    def __init__(self, fetcher, db_path=study_db.DB_PATH, concurrency=4, max_attempts=3):
+        self.fetcher = fetcher
+        self.db_path = db_path
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+    def pending_playlists(self):
+        conn = study_db.connect(self.db_path)
+        try:
+            return conn.execute("SELECT id, url FROM playlists WHERE transcript_status IN ('pending', 'partial', 'failed') ORDER BY id").fetchall()
+        finally:
+            conn.close()
+    def ingest(self, playlist_id, url, cancel_event=None, on_progress=None):
+        conn = study_db.connect(self.db_path)
+        try:
+            name, previous_status = conn.execute("SELECT name, transcript_status FROM playlists WHERE id = ?", (playlist_id,)).fetchone()
+            video_ids = self.fetcher.list_videos(url)
+            fetched = {row[0] for row in conn.execute("SELECT video_id FROM transcript_segments WHERE playlist_id = ?", (playlist_id,))}
+            given_up = {row[0] for row in conn.execute("SELECT video_id FROM transcript_failures WHERE playlist_id = ? AND (permanent OR attempts >= ?)", (playlist_id, self.max_attempts))}
+            pending = [(position, video_id) for position, video_id in enumerate(video_ids) if video_id not in fetched and video_id not in given_up]
+            failures = []
+            added = 0
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="transcript") as pool:
+                futures = {pool.submit(self.fetcher.fetch, video_id): (position, video_id) for position, video_id in pending}
+                try:
+                    for future in as_completed(futures):
+                        position, video_id = futures[future]
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise RequestCancelled("transcript")
+                        try:
+                            text = clean_transcript(future.result())
+                        except Exception as e:
+                            failures.append((video_id, str(e)))
+                            with conn:
+                                conn.execute("INSERT INTO transcript_failures (playlist_id, video_id, attempts, permanent, error) VALUES (?, ?, 1, ?, ?) ON CONFLICT (playlist_id, video_id) DO UPDATE SET attempts = attempts + 1, permanent = excluded.permanent, error = excluded.error", (playlist_id, video_id, is_permanent(e), str(e)[:500]))
+                            if is_permanent(e):
+                                given_up.add(video_id)
+                            continue
+                        with conn:
+                            conn.execute("INSERT OR REPLACE INTO transcript_segments (playlist_id, video_id, position, transcript) VALUES (?, ?, ?, ?)", (playlist_id, video_id, position, compress_transcript(text)))
+                            conn.execute("DELETE FROM transcript_failures WHERE playlist_id = ? AND video_id = ?", (playlist_id, video_id))
+                        added += 1
+                        if on_progress is not None:
+                            on_progress(video_id)
+                finally:
+                    for future in futures:
+                        future.cancel()
+            given_up |= {row[0] for row in conn.execute("SELECT video_id FROM transcript_failures WHERE playlist_id = ? AND attempts >= ?", (playlist_id, self.max_attempts))}
+            available = len(fetched) + added
+            retryable = [video_id for video_id, _ in failures if video_id not in given_up]
+            status = 'done' if not retryable else 'partial' if available else 'failed'
+            transcript = None
+            if added or status != previous_status:
+                segments = [read_transcript(row[0]) for row in conn.execute("SELECT transcript FROM transcript_segments WHERE playlist_id = ? ORDER BY position", (playlist_id,))]
+                transcript = "\n\n".join(segment for segment in segments if segment)
+                with conn:
+                    conn.execute("UPDATE playlists SET transcript = ?, transcript_status = ? WHERE id = ?", (compress_transcript(transcript) if transcript else None, status, playlist_id))
+                    if added and transcript:
+                        SearchIndex(conn).index_document("transcript", playlist_id, name, transcript, commit=False)
+            return {'playlist_id': playlist_id, 'name': name, 'status': status, 'transcript': transcript if added else None, 'videos': len(video_ids), 'available': available, 'fetched': added, 'failures': failures}
+        finally:
+            conn.close()
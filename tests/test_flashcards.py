@@ -0,0 +1,31 @@
+import study_db
+from study_flashcards import Card, DeckStore, parse_flashcards
+def test_parses_pipe_and_labelled_formats():
+    text = "1. Front: Mitosis | Back: Cell division\n- **Q:** What is ATP?\n  **A:** Energy currency\nTerm - Enzyme | Definition - A biological catalyst"
+    assert parse_flashcards(text) == [("Mitosis", "Cell division"), ("What is ATP?", "Energy currency"), ("Enzyme", "A biological catalyst")]
+def test_swapped_labels_are_reordered():
+    assert parse_flashcards("Back: Cell division | Front: Mitosis") == [("Mitosis", "Cell division")]
+def test_hyphenated_terms_keep_their_first_letter():
+    assert parse_flashcards("Q-learning | An RL method\nA-level | British exam") == [("Q-learning", "An RL method"), ("A-level", "British exam")]
+def test_hyphenated_terms_keep_multi_letter_label_words():
+    text = "Front-end | The client side of an app\nBack-propagation | Gradient computation\nQuestion-answering | Answering questions from text\nTerm-limit | A cap on terms served"
+    assert [front for front, back in parse_flashcards(text)] == ["Front-end", "Back-propagation", "Question-answering", "Term-limit"]
+def test_spaced_dash_after_short_labels():
+    assert parse_flashcards("Q - What is a lemma?\nA - A helper theorem") == [("What is a lemma?", "A helper theorem")]
+def test_back_without_front_is_ignored():
+    assert parse_flashcards("Back: orphan\nsome prose") == []
+def test_review_schedules_and_relearns():
+    card = Card(1, 1, "f", "b")
+    card.review(4, now=0)
+    card.review(4, now=0)
+    assert (card.repetitions, card.interval) == (2, 6.0)
+    card.review(1, now=100)
+    assert (card.repetitions, card.interval, card.lapses, card.due_at) == (0, 0.0, 1, 700)
+    assert card.ease >= 1.3
+def test_add_cards_reports_new_and_updated_cards(tmp_path):
+    conn = study_db.connect(str(tmp_path / "cards.db"))
+    store = DeckStore(conn)
+    deck_id = store.deck_for_playlist(None, "Biology")
+    assert store.add_cards(deck_id, [("Mitosis", "Cell division"), ("ATP", "Energy")], now=0) == (2, 0)
+    assert store.add_cards(deck_id, [("Mitosis", "Cell division"), ("ATP", "Energy currency"), ("DNA", "Genome")], now=0) == (1, 1)
+    assert conn.execute("SELECT back FROM flashcards WHERE front = 'ATP'").fetchone()[0] == "Energy currency"
@@ -0,0 +1,50 @@
+import random
+import study_db
+from study_notes import NoteStore, apply_delta, load_note, note_history, text_delta
+def test_delta_round_trip():
+    rng = random.Random(7)
+    old = "hello world"
+    for _ in range(500):
+        pos = rng.randint(0, len(old))
+        new = old[:pos] + rng.choice(["", "x", "\n", "é😀", "hello"]) + old[pos + rng.randint(0, 3):]
+        delta = text_delta(old, new)
+        assert apply_delta(old, delta) == new
+        old = new
+def test_delta_covers_only_the_edit():
+    old = "a" * 1000 + "b" * 1000
+    assert text_delta(old, "a" * 1000 + "X" + "b" * 1000) == (1000, 1000, "X")
+def test_every_kept_version_reconstructs(tmp_path):
+    conn = study_db.connect(str(tmp_path / "notes.db"))
+    store = NoteStore(snapshot_every=5, keep_snapshots=2, compact_every=7)
+    note_id, _ = store.save(conn, None, "Note", "")
+    versions = {1: ""}
+    text = ""
+    for i in range(40):
+        text += f"line {i}\n"
+        note_id, version = store.save(conn, note_id, "Note", text)
+        versions[version] = text
+    assert load_note(conn, note_id) == text
+    kept = [row[0] for row in note_history(conn, note_id)]
+    assert kept and len(kept) < len(versions)
+    for version in kept:
+        assert load_note(conn, note_id, version) == versions[version]
+def test_unchanged_text_adds_no_version(tmp_path):
+    conn = study_db.connect(str(tmp_path / "notes.db"))
+    store = NoteStore()
+    note_id, _ = store.save(conn, None, "Note", "same")
+    assert store.save(conn, note_id, "Renamed", "same") == (note_id, 1)
+    assert conn.execute("SELECT title FROM notes WHERE id = ?", (note_id,)).fetchone()[0] == "Renamed"
+def test_drafts_resolve_to_the_created_note(tmp_path):
+    conn = study_db.connect(str(tmp_path / "notes.db"))
+    store = NoteStore()
+    first, _ = store.save(conn, None, "Draft", "one", draft=3)
+    second, version = store.save(conn, None, "Draft", "one two", draft=3)
+    assert first == second and version == 2
+    assert conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0] == 1
+def test_stale_head_cache_is_reloaded(tmp_path):
+    conn = study_db.connect(str(tmp_path / "notes.db"))
+    store = NoteStore()
+    note_id, _ = store.save(conn, None, "Note", "base")
+    NoteStore().save(conn, note_id, "Note", "base edited elsewhere")
+    store.save(conn, note_id, "Note", "base edited elsewhere, then here")
+    assert load_note(conn, note_id) == "base edited elsewhere, then here"
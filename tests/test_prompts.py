@@ -0,0 +1,22 @@
+from study_core import compact_text, count_tokens, truncate_to_budget
+from study_transcripts import clean_transcript
+def test_compact_text_keeps_note_content():
+    text = "10:30 lecture starts\nSubscribe pattern: observers register callbacks\n[Music] is a tag here"
+    assert compact_text(text) == text
+def test_compact_text_normalizes_whitespace_and_repeats():
+    text = "Heading  \n\n\n\nsame line\nsame line\n\tindented   words\n" + "a long sentence that is repeated later on\n" * 2 + "x\nx\ny\nx"
+    assert compact_text(text) == "Heading\n\nsame line\n\tindented words\na long sentence that is repeated later on\nx\ny\nx"
+def test_truncate_leaves_text_within_budget_untouched():
+    assert truncate_to_budget("short text", 100) == "short text"
+def test_truncate_keeps_headings_start_and_end():
+    text = "# Intro\n\n" + "\n\n".join(f"Paragraph {i} " + "lorem ipsum dolor " * 40 for i in range(60)) + "\n\n## Conclusion\n\nFinal words."
+    result = truncate_to_budget(text, 1000)
+    assert count_tokens(result) <= 1000
+    assert result.startswith("# Intro\n\nParagraph 0 ")
+    assert result.endswith("## Conclusion\n\nFinal words.")
+    assert "omitted ...]" in result
+def test_truncate_splits_a_single_huge_paragraph():
+    assert count_tokens(truncate_to_budget("word " * 20000, 500)) <= 500
+def test_clean_transcript_strips_caption_noise():
+    text = "00:01 [Music] welcome back  everyone\n00:05 like and subscribe to my channel! today we cover mitosis\nclients subscribe to topics\nthanks for watching"
+    assert clean_transcript(text) == "welcome back everyone\ntoday we cover mitosis\nclients subscribe to topics"
@@ -0,0 +1,73 @@
+import json
+import study_db
+from study_transcripts import LocalTranscriptFetcher, TranscriptIngestor
+class TranscriptTimeout(Exception):
+    pass
+class FlakyFetcher(LocalTranscriptFetcher):
+    def __init__(self, root, flaky):
+        super().__init__(root)
+        self.flaky = set(flaky)
+        self.calls = []
+    def fetch(self, video_id):
+        self.calls.append(video_id)
+        if video_id in self.flaky:
+            raise TranscriptTimeout(video_id)
+        return super().fetch(video_id)
+def setup(tmp_path, videos):
+    (tmp_path / "PL1.json").write_text(json.dumps(videos))
+    db_path = str(tmp_path / "study.db")
+    conn = study_db.connect(db_path)
+    with conn:
+        playlist_id = conn.execute(study_db.INSERT_PLAYLIST, ("Biology", "https://www.youtube.com/playlist?list=PL1")).lastrowid
+    conn.close()
+    return db_path, playlist_id
+def status(db_path, playlist_id):
+    conn = study_db.connect(db_path)
+    try:
+        return conn.execute("SELECT transcript_status FROM playlists WHERE id = ?", (playlist_id,)).fetchone()[0]
+    finally:
+        conn.close()
+def test_missing_captions_are_permanent(tmp_path):
+    db_path, playlist_id = setup(tmp_path, ["a", "b"])
+    (tmp_path / "a.txt").write_text("cells divide")
+    ingestor = TranscriptIngestor(LocalTranscriptFetcher(str(tmp_path)), db_path, 2)
+    result = ingestor.ingest(playlist_id, "https://www.youtube.com/playlist?list=PL1")
+    assert result['status'] == 'done'
+    assert result['available'] == 1
+    assert "cells divide" in result['transcript']
+    assert ingestor.pending_playlists() == []
+def test_transient_failures_retry_up_to_cap(tmp_path):
+    db_path, playlist_id = setup(tmp_path, ["a", "b"])
+    (tmp_path / "a.txt").write_text("cells divide")
+    (tmp_path / "b.txt").write_text("enzymes catalyse")
+    fetcher = FlakyFetcher(str(tmp_path), ["a", "b"])
+    ingestor = TranscriptIngestor(fetcher, db_path, 2, max_attempts=2)
+    url = "https://www.youtube.com/playlist?list=PL1"
+    assert ingestor.ingest(playlist_id, url)['status'] == 'failed'
+    assert [row[0] for row in ingestor.pending_playlists()] == [playlist_id]
+    fetcher.flaky = {"b"}
+    result = ingestor.ingest(playlist_id, url)
+    assert result['status'] == 'done'
+    assert result['fetched'] == 1
+    assert status(db_path, playlist_id) == 'done'
+    assert ingestor.pending_playlists() == []
+    assert sorted(fetcher.calls) == ["a", "a", "b", "b"]
+def test_resume_fetches_only_missing_videos(tmp_path):
+    db_path, playlist_id = setup(tmp_path, ["a", "b"])
+    (tmp_path / "a.txt").write_text("cells divide")
+    (tmp_path / "b.txt").write_text("enzymes catalyse")
+    fetcher = FlakyFetcher(str(tmp_path), ["b"])
+    ingestor = TranscriptIngestor(fetcher, db_path, 2)
+    url = "https://www.youtube.com/playlist?list=PL1"
+    assert ingestor.ingest(playlist_id, url)['status'] == 'partial'
+    fetcher.flaky = set()
+    fetcher.calls = []
+    result = ingestor.ingest(playlist_id, url)
+    assert fetcher.calls == ["b"]
+    assert result['status'] == 'done'
+    assert result['transcript'].index("cells divide") < result['transcript'].index("enzymes catalyse")
+    fetcher.calls = []
+    result = ingestor.ingest(playlist_id, url)
+    assert fetcher.calls == []
+    assert result['fetched'] == 0
+    assert result['transcript'] is None